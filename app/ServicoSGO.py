@@ -0,0 +1,61 @@
+import os
+from util.api_token import api_budget, api_budget_months, headers
+from sgo import config
+from sgo.argumentos import criar_parser
+from sgo.dados import obter_dados
+from sgo.exportacao import MOTORES
+from sgo.metricas import metricas
+from sgo.rateios import MOTORES_RATEIO
+from sgo.servico import ServicoRelatorios, servir
+
+
+def main(argv=None):
+    parser = criar_parser(
+        'Serviço local que gera sob demanda as planilhas de rateio e os relatórios SGO.',
+        config.CAMINHO_BANCO_SERVICO, 'variável SGO_SERVICO_BANCO ou ~/.sgo/servico.duckdb',
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='Endereço de escuta (padrão: 127.0.0.1, só esta máquina).')
+    parser.add_argument(
+        '--porta', type=int, default=config.PORTA_SERVICO,
+        help='Porta HTTP do serviço (padrão: variável SGO_SERVICO_PORTA ou 8780).',
+    )
+    parser.add_argument(
+        '--intervalo', type=float, default=config.TTL_SNAPSHOT,
+        help='Minutos entre as sincronizações automáticas com a API; 0 desativa '
+             '(padrão: SGO_TTL_SNAPSHOT).',
+    )
+    parser.add_argument(
+        '--cache-mb', type=float, default=config.CACHE_SERVICO_MB,
+        help='Tamanho máximo do cache de planilhas em memória, em MB (padrão: variável SGO_SERVICO_CACHE_MB ou 256).',
+    )
+    parser.add_argument(
+        '--motor-excel', choices=MOTORES, default=config.MOTOR_EXCEL,
+        help='Motor usado para a Controladoria, a Validação e o Comparativo (padrão: variável SGO_MOTOR_EXCEL).',
+    )
+    parser.add_argument(
+        '--motor-rateio', choices=MOTORES_RATEIO, default=config.MOTOR_RATEIO,
+        help='Motor usado para as planilhas de rateio (padrão: variável SGO_MOTOR_RATEIO ou xml).',
+    )
+    args = parser.parse_args(argv)
+    metricas.script = 'ServicoSGO'
+
+    pasta_arquivos = os.path.join(os.path.expanduser('~'), 'Desktop', 'Arquivos SGO')
+    os.makedirs(pasta_arquivos, exist_ok=True)
+
+    # Dados carregados uma única vez (da API ou do snapshot local ainda válido)
+    armazem = obter_dados(args, pasta_arquivos, api_budget, api_budget_months, headers)
+    metricas.exportar(args.metricas, args.metricas_prometheus)
+
+    servico = ServicoRelatorios(
+        armazem, args, pasta_arquivos, api_budget, api_budget_months, headers,
+        int(args.cache_mb * 1024 * 1024),
+    )
+    try:
+        servir(servico, args.host, args.porta, args.intervalo)
+    finally:
+        armazem.close()
+        metricas.exportar(args.metricas, args.metricas_prometheus)
+
+
+if __name__ == '__main__':
+    main()
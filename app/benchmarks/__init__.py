@@ -0,0 +1,2 @@
+# Medições de desempenho do pipeline SGO, executadas a partir da pasta app:
+#   python -m benchmarks.comparar_exportacao
@@ -0,0 +1,171 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+import tracemalloc
+
+import duckdb
+
+from sgo.consultas import SQL_VALIDACAO
+from sgo.exportacao import MOTORES, exportar_consulta
+from sgo.metricas import pico_memoria_mb
+
+# Compara tempo e memória dos motores de exportação Excel sobre uma tabela
+# 'geral' sintética, com as mesmas colunas do snapshot do SGO.
+# Cada motor roda em um processo próprio, para que o pico de memória de um
+# não contamine a medição do outro.
+#
+#   python -m benchmarks.comparar_exportacao --linhas 200000
+#   python -m benchmarks.comparar_exportacao --linhas 50000 --json resultado.json
+
+# Tempo máximo, em segundos, de cada motor antes de a medição ser abandonada
+TEMPO_MAXIMO = 1800
+
+SQL_GERAL_SINTETICO = '''
+    CREATE TABLE geral AS
+    SELECT
+        i // 10 AS Id_Orçamento,
+        'CT-' || (i // 10) AS Contrato,
+        'Janeiro' AS Mes_Reajuste,
+        4.5 AS Reajuste_Percentual,
+        1000.0 * (i // 10) AS Valor,
+        'F' || (i % 500) AS Cod_Fornecedor,
+        '3.1.' || (i % 40) AS COD_CONTA_CONTABIL,
+        'Conta contábil ' || (i % 40) AS DESC_CONTA_CONTABIL,
+        'Fornecedor ' || (i % 500) AS Fornecedor,
+        'Origem' AS Origem,
+        'S' || (i % 300) AS COD_SETOR,
+        'CC' || (i % 300) AS COD_CCUSTO,
+        'Centro de custo ' || (i % 300) AS CENTRO_CUSTO,
+        (i % 17)::DOUBLE AS BASE,
+        'Empresa ' || (i % 4) AS EMPRESA,
+        'Nível ' || (i % 30) AS Nivel,
+        'Gestor ' || (i % 80) AS Gestor,
+        'Critério ' || (i % 12) AS Criterio,
+        'Descrição do critério ' || (i % 12) AS Descricao_criterio,
+        2025 AS Ano,
+        random() * 1000 AS Janeiro, random() * 1000 AS Fevereiro, random() * 1000 AS Março,
+        random() * 1000 AS Abril, random() * 1000 AS Maio, random() * 1000 AS Junho,
+        random() * 1000 AS Julho, random() * 1000 AS Agosto, random() * 1000 AS Setembro,
+        random() * 1000 AS Outubro, random() * 1000 AS Novembro, random() * 1000 AS Dezembro,
+        random() * 12000 AS Total_Anual,
+        i // 10 AS posicao_orcamento,
+        i % 10 + 1 AS posicao_item
+    FROM range(?) t(i)
+'''
+
+
+def _medir(motor, linhas, rastrear_python, fila):
+    con = duckdb.connect(':memory:')
+    con.execute('SET enable_progress_bar = false')
+    con.execute(SQL_GERAL_SINTETICO, [linhas])
+    rss_inicial = pico_memoria_mb()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        file_path = os.path.join(pasta, 'Validacao dos Dados SGO.xlsx')
+        if rastrear_python:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        try:
+            exportar_consulta(con, SQL_VALIDACAO, file_path, motor)
+            erro = None
+        except Exception as err:
+            erro = str(err)
+        duracao = time.perf_counter() - inicio
+        pico_python = None
+        if rastrear_python:
+            _, pico_python = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        tamanho = os.path.getsize(file_path) if erro is None else None
+
+    rss_final = pico_memoria_mb()
+    fila.put({
+        'motor': motor,
+        'linhas': linhas,
+        'segundos': round(duracao, 3),
+        'pico_python_mb': round(pico_python / 1024 / 1024, 1) if pico_python is not None else None,
+        'pico_rss_mb': round(rss_final, 1) if rss_final is not None else None,
+        'acrescimo_rss_mb': round(rss_final - rss_inicial, 1) if rss_final is not None else None,
+        'arquivo_mb': round(tamanho / 1024 / 1024, 2) if tamanho is not None else None,
+        'erro': erro,
+    })
+
+
+def _aguardar_resultado(processo, fila, tempo_maximo):
+    # Espera o resultado do processo de medição sem ficar preso se ele morrer
+    # antes de enviá-lo (ex.: encerrado por falta de memória) ou não terminar
+    # dentro de tempo_maximo segundos. Devolve (resultado ou None, erro ou None).
+    limite = time.monotonic() + tempo_maximo
+    while True:
+        try:
+            return fila.get(timeout=1), None
+        except queue.Empty:
+            pass
+        if not processo.is_alive():
+            # O resultado pode ter chegado junto com o fim do processo
+            try:
+                return fila.get(timeout=1), None
+            except queue.Empty:
+                return None, f'processo de medição encerrado sem resultado (código de saída {processo.exitcode})'
+        if time.monotonic() > limite:
+            processo.terminate()
+            return None, f'tempo máximo de {tempo_maximo:.0f} s excedido'
+
+
+def comparar(linhas, motores=MOTORES, rastrear_python=False, tempo_maximo=TEMPO_MAXIMO):
+    contexto = multiprocessing.get_context('spawn')
+    resultados = []
+    for motor in motores:
+        fila = contexto.Queue()
+        processo = contexto.Process(target=_medir, args=(motor, linhas, rastrear_python, fila))
+        processo.start()
+        resultado, erro = _aguardar_resultado(processo, fila, tempo_maximo)
+        processo.join()
+        if resultado is None:
+            resultado = {
+                'motor': motor, 'linhas': linhas, 'segundos': None, 'pico_python_mb': None,
+                'pico_rss_mb': None, 'acrescimo_rss_mb': None, 'arquivo_mb': None, 'erro': erro,
+            }
+        resultados.append(resultado)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara os motores de exportação Excel do SGO.')
+    parser.add_argument('--linhas', type=int, default=100000, help='Linhas da tabela sintética (padrão: 100000).')
+    parser.add_argument('--motores', nargs='+', choices=MOTORES, default=list(MOTORES))
+    parser.add_argument(
+        '--tracemalloc', action='store_true',
+        help='Mede também o pico de memória dos objetos Python (deixa a exportação bem mais lenta).',
+    )
+    parser.add_argument(
+        '--tempo-maximo', type=float, default=TEMPO_MAXIMO,
+        help=f'Segundos por motor antes de abandonar a medição (padrão: {TEMPO_MAXIMO}).',
+    )
+    parser.add_argument('--json', help='Grava os resultados neste arquivo JSON.')
+    args = parser.parse_args()
+
+    resultados = comparar(args.linhas, args.motores, args.tracemalloc, args.tempo_maximo)
+
+    print(f"{'motor':<12}{'tempo (s)':>12}{'pico Python (MB)':>18}{'acréscimo RSS (MB)':>20}{'arquivo (MB)':>14}")
+    for resultado in resultados:
+        if resultado['erro']:
+            print(f"{resultado['motor']:<12}  {resultado['erro']}")
+            continue
+        print(
+            f"{resultado['motor']:<12}{resultado['segundos']:>12.2f}"
+            f"{resultado['pico_python_mb'] if resultado['pico_python_mb'] is not None else '-':>18}"
+            f"{resultado['acrescimo_rss_mb'] if resultado['acrescimo_rss_mb'] is not None else '-':>20}"
+            f"{resultado['arquivo_mb']:>14.2f}"
+        )
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Servidor local que imita a API SGO, para medir o pipeline sem acessar a
+# produção. Implementa os dois endpoints usados pelos scripts:
+#   GET /budgets/get-all[?cycleId=<ciclo>]
+#   GET /budget-months?budgetId=<id>
+# Os dados são sintéticos e determinísticos (mesma semente, mesmos dados).
+# Os orçamentos se distribuem entre os anos pedidos, com cycleId = ano - 2000.
+# É possível acrescentar latência a cada resposta e responder 429 com
+# Retry-After, como faz a API real: ao passar de um limite de requisições por
+# segundo (limite_rps) e/ou em uma fração aleatória das requisições de meses (taxa_429).
+# As respostas 200 levam ETag; com If-None-Match igual, a resposta é 304 sem corpo.
+#
+#   python -m benchmarks.mock_sgo --orcamentos 10000 --latencia 20 --limite-rps 50
+
+ROTA_ORCAMENTOS = '/budgets/get-all'
+ROTA_MESES = '/budget-months'
+
+MESES = [
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december',
+]
+
+
+def gerar_orcamento(budget_id, ano=2025):
+    aleatorio = random.Random(budget_id)
+    fornecedor = aleatorio.randint(1, 500)
+    conta = aleatorio.randint(1, 40)
+    criterio = aleatorio.randint(1, 12)
+    return {
+        'active': True,
+        'id': budget_id,
+        'contractNumber': f'CT-{budget_id}',
+        'adjustmentMonth': aleatorio.choice(['Janeiro', 'Abril', 'Julho', 'Outubro']),
+        'adjustmentPercentage': round(aleatorio.uniform(0, 10), 2),
+        'value': round(aleatorio.uniform(1000, 1000000), 2),
+        'cycleId': ano - 2000,
+        'supplier': {'code': f'F{fornecedor}', 'description': f'Fornecedor {fornecedor}'},
+        'budgetAccount': {'code': f'3.1.{conta}', 'description': f'Conta contábil {conta}'},
+        'origin': {'description': 'Origem'},
+        'levelSix': {'description': f'Nível {aleatorio.randint(1, 30)}'},
+        'manager': {'description': f'Gestor {aleatorio.randint(1, 80)}'},
+        'apportionment': {'name': f'Critério {criterio}', 'description': f'Descrição do critério {criterio}'},
+        'cycle': {'budgetYear': ano},
+    }
+
+
+def gerar_meses(budget_id, itens_por_orcamento=3):
+    aleatorio = random.Random(-budget_id)
+    meses = []
+    for _ in range(itens_por_orcamento):
+        setor = aleatorio.randint(1, 300)
+        item = {mes: round(aleatorio.uniform(0, 1000), 2) for mes in MESES}
+        item['budgetId'] = budget_id
+        item['budgetApportionmentItem'] = {
+            'base': aleatorio.randint(0, 20),
+            'sector': {
+                'code': f'S{setor}',
+                'codeCostCenter': f'CC{setor}',
+                'name': f'Centro de custo {setor}',
+                'company': {'name': f'Empresa {setor % 4}'},
+            },
+        }
+        meses.append(item)
+    return meses
+
+
+class _ManipuladorSGO(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo=b'', cabecalhos=None):
+        self.send_response(status)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _responder_json(self, corpo):
+        # 200 com ETag, ou 304 se o cliente já tem esta versão
+        etag = '"' + hashlib.md5(corpo).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self._responder(304, cabecalhos={'ETag': etag})
+        else:
+            self._responder(200, corpo, {'ETag': etag})
+
+    def do_GET(self):
+        servidor = self.server
+        url = urlparse(self.path)
+
+        if servidor.latencia:
+            time.sleep(servidor.latencia * servidor.aleatorio_latencia())
+
+        if url.path == ROTA_ORCAMENTOS:
+            ciclo = parse_qs(url.query).get('cycleId', [None])[0]
+            self._responder_json(servidor.corpo_orcamentos(int(ciclo) if ciclo else None))
+            return
+
+        if url.path != ROTA_MESES:
+            self._responder(404)
+            return
+
+        try:
+            budget_id = int(parse_qs(url.query)['budgetId'][0])
+        except (KeyError, ValueError):
+            self._responder(400)
+            return
+        if not 1 <= budget_id <= servidor.orcamentos:
+            self._responder(404)
+            return
+
+        retry_after = servidor.verificar_limite()
+        if retry_after is not None:
+            self._responder(429, cabecalhos={'Retry-After': f'{retry_after:.3f}'})
+            return
+
+        self._responder_json(json.dumps(gerar_meses(budget_id, servidor.itens_por_orcamento)).encode('utf-8'))
+
+
+class ServidorMockSGO(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, orcamentos, itens_por_orcamento=3, latencia=0.0,
+                 taxa_429=0.0, retry_after=0.2, limite_rps=None, anos=(2025,), semente=0):
+        super().__init__(endereco, _ManipuladorSGO)
+        self.orcamentos = orcamentos
+        self.itens_por_orcamento = itens_por_orcamento
+        # Latência em segundos, com variação de ±50% entre as respostas
+        self.latencia = latencia
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.limite_rps = limite_rps
+        self.anos = tuple(anos)
+        self._janela = 0
+        self._requisicoes_janela = 0
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self._corpos_orcamentos = {}
+
+    def aleatorio_latencia(self):
+        with self._lock:
+            return self._aleatorio.uniform(0.5, 1.5)
+
+    def verificar_limite(self):
+        # Devolve o Retry-After (segundos) se a requisição deve receber 429, senão None
+        with self._lock:
+            if self.limite_rps:
+                agora = time.monotonic()
+                if int(agora) != self._janela:
+                    self._janela = int(agora)
+                    self._requisicoes_janela = 0
+                self._requisicoes_janela += 1
+                if self._requisicoes_janela > self.limite_rps:
+                    # Aguardar até o início da próxima janela de um segundo
+                    return self._janela + 1 - agora
+            if self.taxa_429 and self._aleatorio.random() < self.taxa_429:
+                return self.retry_after
+        return None
+
+    def corpo_orcamentos(self, ciclo=None):
+        # Montado na primeira chamada de cada ciclo e reaproveitado nas seguintes.
+        # Sem ciclo, devolve os orçamentos de todos os anos.
+        with self._lock:
+            if ciclo not in self._corpos_orcamentos:
+                orcamentos = []
+                for budget_id in range(1, self.orcamentos + 1):
+                    ano = self.anos[budget_id % len(self.anos)]
+                    if ciclo is None or ano - 2000 == ciclo:
+                        orcamentos.append(gerar_orcamento(budget_id, ano))
+                self._corpos_orcamentos[ciclo] = json.dumps(orcamentos).encode('utf-8')
+            return self._corpos_orcamentos[ciclo]
+
+
+def _servir(fila, host, porta, kwargs):
+    servidor = ServidorMockSGO((host, porta), **kwargs)
+    fila.put(servidor.server_address[1])
+    servidor.serve_forever()
+
+
+class MockSGO:
+    # Executa o servidor em um processo separado, para que o atendimento das
+    # requisições não dispute o GIL com o pipeline medido.
+    #
+    #   with MockSGO(orcamentos=1000, latencia=0.02) as mock:
+    #       mock.api_budget, mock.api_budget_months
+    def __init__(self, orcamentos, host='127.0.0.1', porta=0, **kwargs):
+        self.host = host
+        self.porta = porta
+        self._kwargs = dict(kwargs, orcamentos=orcamentos)
+        self._processo = None
+
+    @property
+    def url_base(self):
+        return f'http://{self.host}:{self.porta}'
+
+    @property
+    def api_budget(self):
+        return self.url_base + ROTA_ORCAMENTOS
+
+    @property
+    def api_budget_months(self):
+        return self.url_base + ROTA_MESES
+
+    def iniciar(self):
+        contexto = multiprocessing.get_context('spawn')
+        fila = contexto.Queue()
+        self._processo = contexto.Process(
+            target=_servir, args=(fila, self.host, self.porta, self._kwargs), daemon=True
+        )
+        self._processo.start()
+        # Com porta 0, o sistema escolhe uma porta livre, informada pelo processo
+        self.porta = fila.get(timeout=30)
+        return self
+
+    def parar(self):
+        if self._processo is not None:
+            self._processo.terminate()
+            self._processo.join()
+            self._processo = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita a API SGO.')
+    parser.add_argument('--orcamentos', type=int, default=1000, help='Quantidade de orçamentos (padrão: 1000).')
+    parser.add_argument('--itens', type=int, default=3, help='Itens de rateio por orçamento (padrão: 3).')
+    parser.add_argument('--latencia', type=float, default=0, help='Latência média por resposta, em ms.')
+    parser.add_argument('--taxa-429', type=float, default=0, help='Fração das requisições de meses respondidas com 429.')
+    parser.add_argument('--retry-after', type=float, default=0.2, help='Retry-After das respostas 429 aleatórias, em segundos.')
+    parser.add_argument('--limite-rps', type=float, help='Responde 429 acima desta quantidade de requisições por segundo.')
+    parser.add_argument('--anos', type=int, nargs='+', default=[2025], help='Anos dos ciclos (cycleId = ano - 2000).')
+    parser.add_argument('--porta', type=int, default=8765)
+    args = parser.parse_args()
+
+    servidor = ServidorMockSGO(
+        ('127.0.0.1', args.porta), args.orcamentos, args.itens,
+        args.latencia / 1000, args.taxa_429, args.retry_after, args.limite_rps, args.anos,
+    )
+    print(f'API SGO simulada em http://127.0.0.1:{args.porta}')
+    print(f'  api_budget = "http://127.0.0.1:{args.porta}{ROTA_ORCAMENTOS}"')
+    print(f'  api_budget_months = "http://127.0.0.1:{args.porta}{ROTA_MESES}"')
+    servidor.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
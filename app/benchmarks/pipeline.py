@@ -0,0 +1,162 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_sgo import MockSGO
+from sgo import config
+from sgo.armazenamento import ArmazemSGO
+from sgo.cliente import ClienteSGO
+from sgo.coleta import buscar_meses_por_orcamento
+from sgo.consultas import SQL_GRUPO, SQL_VALIDACAO
+from sgo.dados import obter_orcamentos
+from sgo.exportacao import MOTORES, exportar_consulta
+from sgo.metricas import Metricas
+from sgo.rateios import MOTORES_RATEIO, agrupar_rateios, gerar_planilhas_rateio
+
+# Mede cada etapa dos dois scripts (coleta, normalização, junção no DuckDB e
+# gravação dos Excel) contra a API simulada de benchmarks/mock_sgo.py, sem
+# acessar a produção. As URLs da API são passadas direto para as rotinas de
+# sgo/, então util/api_token.py não é usado.
+#
+#   python -m benchmarks.pipeline --orcamentos 1000 10000 --latencia 20 --limite-rps 200
+#   python -m benchmarks.pipeline --orcamentos 100000 --sem-rateios --json resultado.json
+
+
+class _Etapas(Metricas):
+    @contextlib.contextmanager
+    def medir(self, nome, silencioso=True):
+        # As rotinas de sgo/ informam cada orçamento e arquivo no terminal e
+        # desenham barras do tqdm no stderr; durante a medição as duas saídas
+        # são descartadas
+        with open(os.devnull, 'w') as nulo, contextlib.ExitStack() as saidas:
+            if silencioso:
+                saidas.enter_context(contextlib.redirect_stdout(nulo))
+                saidas.enter_context(contextlib.redirect_stderr(nulo))
+            with self.etapa(nome) as registro:
+                yield registro
+
+
+def executar(orcamentos, args):
+    etapas = _Etapas()
+    silencioso = not args.verboso
+    mock = MockSGO(
+        orcamentos, itens_por_orcamento=args.itens, latencia=args.latencia / 1000,
+        taxa_429=args.taxa_429, retry_after=args.retry_after, limite_rps=args.limite_rps,
+    )
+
+    with mock, tempfile.TemporaryDirectory() as pasta:
+        armazem = ArmazemSGO(os.path.join(pasta, 'sgo.duckdb'))
+        cliente = ClienteSGO({}, max_conexoes=args.workers)
+
+        with etapas.medir('coleta_orcamentos', silencioso) as registro:
+            budget = obter_orcamentos(cliente, mock.api_budget)
+            registro['orcamentos'] = len(budget)
+
+        with etapas.medir('coleta_meses', silencioso) as registro:
+            meses_por_orcamento, falhas = buscar_meses_por_orcamento(
+                budget, mock.api_budget_months, cliente,
+                max_workers=args.workers, max_req_por_segundo=args.rps,
+                req_por_segundo_inicial=args.rps_inicial or args.rps,
+                meses_por_orcamento=armazem.receber_meses(),
+            )
+            registro.update(cliente.estatisticas())
+            registro['falhas'] = len(falhas)
+        cliente.close()
+
+        with etapas.medir('normalizacao', silencioso) as registro:
+            armazem.salvar(budget, meses_por_orcamento)
+            registro['linhas'] = armazem.con.execute('SELECT count(*) FROM budget_months').fetchone()[0]
+
+        with etapas.medir('juncao', silencioso) as registro:
+            armazem.atualizar_snapshot()
+            registro['linhas'] = armazem.con.execute('SELECT count(*) FROM geral').fetchone()[0]
+
+        relatorios = [
+            ('excel_validacao', SQL_VALIDACAO, 'Validacao dos Dados SGO.xlsx'),
+            ('excel_controladoria', SQL_GRUPO, 'Controladoria.xlsx'),
+        ]
+        for nome, sql, nome_arquivo in relatorios:
+            with etapas.medir(nome, silencioso) as registro:
+                file_path = os.path.join(pasta, nome_arquivo)
+                exportar_consulta(armazem.con, sql, file_path, args.motor_excel)
+                registro['arquivo_bytes'] = os.path.getsize(file_path)
+
+        if not args.sem_rateios:
+            pasta_rateios = os.path.join(pasta, 'rateios')
+            os.makedirs(pasta_rateios)
+            with etapas.medir('excel_rateios', silencioso) as registro:
+                resultados = gerar_planilhas_rateio(
+                    agrupar_rateios(armazem.con), pasta_rateios, args.processos, armazem.data_snapshot(),
+                    motor=args.motor_rateio,
+                )
+                registro['arquivos'] = len(resultados)
+                registro['falhas'] = sum(1 for resultado in resultados if resultado.erro)
+
+        armazem.close()
+
+    return {
+        'orcamentos': orcamentos,
+        'total_segundos': round(sum(etapa['segundos'] for etapa in etapas.etapas), 3),
+        'etapas': etapas.etapas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede as etapas do pipeline SGO contra uma API simulada.')
+    parser.add_argument(
+        '--orcamentos', type=int, nargs='+', default=[1000],
+        help='Quantidades de orçamentos a medir, ex.: 1000 10000 100000 (padrão: 1000).',
+    )
+    parser.add_argument('--itens', type=int, default=3, help='Itens de rateio por orçamento (padrão: 3).')
+    parser.add_argument('--latencia', type=float, default=0, help='Latência média da API simulada, em ms.')
+    parser.add_argument('--taxa-429', type=float, default=0, help='Fração das requisições de meses respondidas com 429.')
+    parser.add_argument('--retry-after', type=float, default=0.2, help='Retry-After das respostas 429 aleatórias, em segundos.')
+    parser.add_argument('--limite-rps', type=float, help='A API simulada responde 429 acima desta taxa (req/s).')
+    parser.add_argument('--workers', type=int, default=config.MAX_WORKERS, help='Requisições simultâneas.')
+    parser.add_argument('--rps', type=float, default=1000, help='Teto de requisições por segundo (padrão: 1000).')
+    parser.add_argument(
+        '--rps-inicial', type=float,
+        help='Taxa inicial da coleta. Por padrão começa no teto (--rps); use o valor de '
+             'SGO_RPS_INICIAL para medir também a subida gradual da taxa.',
+    )
+    parser.add_argument('--motor-excel', choices=MOTORES, default=config.MOTOR_EXCEL)
+    parser.add_argument('--motor-rateio', choices=MOTORES_RATEIO, default=config.MOTOR_RATEIO)
+    parser.add_argument('--processos', type=int, default=1, help='Processos para as planilhas de rateio.')
+    parser.add_argument('--sem-rateios', action='store_true', help='Não mede a geração das planilhas de rateio.')
+    parser.add_argument('--verboso', action='store_true', help='Mantém as mensagens das rotinas medidas.')
+    parser.add_argument('--json', help='Grava os resultados neste arquivo JSON.')
+    args = parser.parse_args()
+
+    relatorio = {
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {
+            chave: valor for chave, valor in vars(args).items() if chave not in ('json', 'verboso')
+        },
+        'execucoes': [],
+    }
+
+    for orcamentos in args.orcamentos:
+        execucao = executar(orcamentos, args)
+        relatorio['execucoes'].append(execucao)
+
+        print(f"\n{orcamentos} orçamentos ({execucao['total_segundos']:.2f}s no total)", file=sys.stderr)
+        print(f"  {'etapa':<22}{'tempo (s)':>12}{'CPU (s)':>12}", file=sys.stderr)
+        for etapa in execucao['etapas']:
+            print(f"  {etapa['etapa']:<22}{etapa['segundos']:>12.2f}{etapa['segundos_cpu']:>12.2f}", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
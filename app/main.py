@@ -0,0 +1,46 @@
+import sys
+from multiprocessing import freeze_support
+
+# Ponto de entrada único dos relatórios SGO, para execuções agendadas:
+#
+#   python main.py orcamento [opções]   -> OrcamentoSGO.py
+#   python main.py rateios [opções]     -> RateiosSGO.py
+#   python main.py servico [opções]     -> ServicoSGO.py
+#
+# Apenas o script escolhido é importado. As opções são as do próprio script
+# (python main.py rateios --help).
+COMANDOS = {
+    'orcamento': ('OrcamentoSGO', 'Relatórios de validação e da controladoria.'),
+    'rateios': ('RateiosSGO', 'Planilhas de rateio por contrato.'),
+    'servico': ('ServicoSGO', 'Serviço local que gera as planilhas sob demanda.'),
+}
+
+
+def uso():
+    linhas = ['Uso: python main.py <comando> [opções]', '', 'Comandos:']
+    for comando, (_, descricao) in COMANDOS.items():
+        linhas.append(f'  {comando:<12}{descricao}')
+    linhas.append('')
+    linhas.append('Use "python main.py <comando> --help" para ver as opções de cada comando.')
+    return '\n'.join(linhas)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(uso())
+        return 0 if argv else 2
+    if argv[0] not in COMANDOS:
+        print(f'Comando desconhecido: {argv[0]}\n\n{uso()}', file=sys.stderr)
+        return 2
+
+    modulo, _ = COMANDOS[argv[0]]
+    __import__(modulo).main(argv[1:])
+    return 0
+
+
+if __name__ == '__main__':
+    # No executável do pyinstaller, os processos de --processos reiniciam o
+    # programa: freeze_support faz com que executem só a tarefa recebida
+    freeze_support()
+    sys.exit(main())
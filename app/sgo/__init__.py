@@ -0,0 +1 @@
+# Pacote com as rotinas compartilhadas entre OrcamentoSGO.py e RateiosSGO.py
@@ -0,0 +1,62 @@
+import argparse
+
+from sgo import config
+from sgo.colunar import FORMATOS
+
+
+def criar_parser(descricao, banco_padrao=None, ajuda_banco='variável SGO_BANCO ou ~/.sgo/sgo.duckdb'):
+    # Argumentos de linha de comando comuns aos scripts do SGO
+    parser = argparse.ArgumentParser(description=descricao)
+    parser.add_argument(
+        '--sync', action='store_true',
+        help='Busca na API apenas os meses dos orçamentos novos ou alterados desde a última execução.',
+    )
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='Retoma uma coleta interrompida, sem buscar de novo os orçamentos já obtidos.',
+    )
+    parser.add_argument(
+        '--atualizar', action='store_true',
+        help='Consulta a API mesmo que o snapshot dos dados ainda esteja dentro da validade.',
+    )
+    parser.add_argument(
+        '--ciclos', metavar='CYCLE_ID', type=int, nargs='+', default=config.CICLOS,
+        help='Busca os orçamentos destes ciclos (cycleId) em paralelo e os guarda juntos no banco '
+             'local, ex.: --ciclos 5 6 (padrão: variável SGO_CICLOS ou os orçamentos que a API devolve). '
+             'Os relatórios trazem todos os ciclos do banco local; sem --ciclos, os ciclos fora da '
+             'lista padrão da API são removidos do banco.',
+    )
+    parser.add_argument(
+        '--headless', action='store_true', default=config.HEADLESS,
+        help='Execução sem interação (agendada/em lote): sem a animação de abertura e sem as '
+             'pausas entre as mensagens (padrão: variável SGO_HEADLESS).',
+    )
+    parser.add_argument(
+        '--colunar', metavar='PASTA', default=config.PASTA_COLUNAR,
+        help='Grava também budget, budget_months, df_geral e df_grupo em formato colunar '
+             'nesta pasta (padrão: variável SGO_PASTA_COLUNAR).',
+    )
+    parser.add_argument(
+        '--formato-colunar', choices=FORMATOS, default='parquet',
+        help='Formato da exportação colunar: parquet (particionado) ou arrow (Arrow IPC, requer pyarrow).',
+    )
+    parser.add_argument(
+        '--metricas', metavar='ARQUIVO', default=config.METRICAS_JSON,
+        help='Grava as métricas da execução (tempo por etapa, requisições, memória) neste '
+             'arquivo JSON (padrão: variável SGO_METRICAS).',
+    )
+    parser.add_argument(
+        '--metricas-prometheus', metavar='ARQUIVO', default=config.METRICAS_PROMETHEUS,
+        help='Grava as métricas da execução no formato textfile do Prometheus '
+             '(padrão: variável SGO_METRICAS_PROMETHEUS).',
+    )
+    parser.add_argument(
+        '--cache-http', metavar='ARQUIVO', nargs='?', const=config.CAMINHO_CACHE_HTTP, default=config.CACHE_HTTP,
+        help='Guarda as respostas da API em um cache em disco e as reaproveita por SGO_CACHE_TTL minutos '
+             f'(padrão do arquivo: {config.CAMINHO_CACHE_HTTP}; variável SGO_CACHE_HTTP).',
+    )
+    parser.add_argument(
+        '--banco', default=banco_padrao,
+        help=f'Caminho do banco DuckDB local (padrão: {ajuda_banco}).',
+    )
+    return parser
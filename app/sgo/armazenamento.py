@@ -0,0 +1,410 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import duckdb
+from tqdm import tqdm
+
+from sgo import config
+from sgo.consultas import (
+    CHAVES_GRUPO, SQL_BUDGET_TIPADO, SQL_GERAL, SQL_GRUPO_AGREGADO, SQL_MESES_TIPADO,
+    SQL_NAO_CONVERTIDOS_BUDGET, SQL_NAO_CONVERTIDOS_MESES, SQL_NUMEROS_EM_TEXTO_BUDGET,
+    SQL_NUMEROS_EM_TEXTO_MESES, SQL_VALIDACAO,
+)
+from sgo.metricas import metricas
+
+
+def hash_orcamento(budget_entry):
+    # Hash do registro completo do orçamento (valor, reajuste, datas de atualização etc.)
+    conteudo = json.dumps(budget_entry, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(conteudo.encode('utf-8')).hexdigest()
+
+
+def _somente_ids_alterados(sql, tabela_raw, coluna_id):
+    # Restringe a conversão tipada às linhas da tabela raw registradas em 'ids_alterados'
+    return sql.replace(
+        f'FROM {tabela_raw}',
+        f'FROM {tabela_raw} WHERE {coluna_id} IN (SELECT id FROM ids_alterados)',
+    )
+
+
+def _grupo_restrito(filtro):
+    # Agregação da controladoria apenas sobre os orçamentos que atendem ao filtro
+    juncao = 'JOIN budget_months bm ON b.id = bm.budgetId'
+    return SQL_GRUPO_AGREGADO.replace(juncao, f'{juncao}\n    WHERE {filtro}')
+
+
+def _mesmo_grupo(a, b):
+    # Comparação das chaves do grupo que considera NULL igual a NULL
+    return ' AND '.join(f'{a}.{coluna} IS NOT DISTINCT FROM {b}.{coluna}' for coluna in CHAVES_GRUPO)
+
+
+# Respostas de meses gravadas no banco por vez durante a coleta
+TAMANHO_LOTE_MESES = 500
+
+
+class MesesRecebidos:
+    # Meses dos orçamentos recebidos da API, gravados no banco local em lotes:
+    # o corpo JSON de cada resposta vai para 'meses_recebidos' e, no mesmo lote,
+    # é convertido pelo DuckDB nas colunas tipadas de 'meses_recebidos_tipados'
+    # (meses em DOUBLE, setor/empresa em VARCHAR com compressão de dicionário).
+    # Assim, a memória do processo fica limitada a um lote de respostas, e a
+    # conversão acontece enquanto os próximos orçamentos ainda estão sendo baixados.
+    # Usa a interface de um dicionário {budget_id: corpo JSON} para gravação.
+    def __init__(self, con, tamanho_lote=None):
+        self.con = con
+        self.tamanho_lote = tamanho_lote or TAMANHO_LOTE_MESES
+        self._lote = []
+        self._ids = set()
+        self._posicao = 0
+        self.con.execute('CREATE OR REPLACE TABLE meses_recebidos (budget_id BIGINT, payload VARCHAR)')
+        self.con.execute(
+            f'CREATE OR REPLACE TABLE meses_recebidos_tipados AS SELECT * FROM ({SQL_MESES_TIPADO}) LIMIT 0'
+        )
+
+    def __setitem__(self, budget_id, payload):
+        self._lote.append((budget_id, payload))
+        self._ids.add(budget_id)
+        if len(self._lote) >= self.tamanho_lote:
+            self.gravar_lote()
+
+    def __contains__(self, budget_id):
+        return budget_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def update(self, meses):
+        for budget_id, payload in meses.items():
+            self[budget_id] = payload
+
+    def gravar_lote(self):
+        if not self._lote:
+            return
+        import pandas as pd
+
+        inicio = self._posicao
+        lote = pd.DataFrame({
+            'budget_id': pd.Series([budget_id for budget_id, _ in self._lote], dtype='int64'),
+            'payload': [payload for _, payload in self._lote],
+            'posicao': range(inicio, inicio + len(self._lote)),
+        })
+        self._posicao += len(self._lote)
+        self._lote = []
+
+        self.con.register('lote_meses', lote)
+        self.con.execute('INSERT INTO meses_recebidos SELECT budget_id, payload FROM lote_meses ORDER BY posicao')
+        # Mesma conversão de SQL_MESES_TIPADO, aplicada apenas ao lote recebido
+        sql_lote = SQL_MESES_TIPADO.replace(
+            'FROM budget_months_raw', 'FROM lote_meses ORDER BY posicao'
+        )
+        self.con.execute(f'INSERT INTO meses_recebidos_tipados {sql_lote}')
+        self.con.unregister('lote_meses')
+
+    def descartar(self):
+        self.con.execute('DROP TABLE IF EXISTS meses_recebidos')
+        self.con.execute('DROP TABLE IF EXISTS meses_recebidos_tipados')
+        self._lote = []
+        self._ids = set()
+
+
+class ArmazemSGO:
+    # Banco DuckDB persistente com os orçamentos e os meses obtidos da API.
+    # Os dados são mantidos entre execuções, o que permite buscar apenas os
+    # orçamentos novos ou alterados (modo --sync).
+    # As respostas da API ficam como JSON em budget_raw/budget_months_raw e
+    # são convertidas pelo próprio DuckDB nas tabelas tipadas 'budget' e
+    # 'budget_months', atualizadas apenas para os orçamentos gravados ou removidos.
+    # Da mesma forma, a tabela 'grupo' guarda o relatório da controladoria já
+    # agregado e só tem recalculados os grupos desses orçamentos.
+    def __init__(self, caminho=None):
+        caminho = caminho or config.CAMINHO_BANCO
+        if caminho != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self.caminho = caminho
+        try:
+            self.con = duckdb.connect(database=caminho)
+        except duckdb.IOException as err:
+            if 'lock' not in str(err).lower():
+                raise
+            # Outro processo (outro script ou o ServicoSGO.py com o mesmo --banco)
+            # está com o banco aberto: o DuckDB só permite um por vez
+            tqdm.write(
+                f"O banco local {caminho} está em uso por outro processo. Aguarde o fim da outra "
+                f"execução ou use outro banco com --banco (ou a variável SGO_BANCO)."
+            )
+            sys.exit(1)  # Encerra o programa com código de erro
+        self._criar_tabelas()
+
+    def _criar_tabelas(self):
+        self.con.execute('''
+            CREATE TABLE IF NOT EXISTS budget_raw (
+                id BIGINT PRIMARY KEY,
+                hash VARCHAR NOT NULL,
+                payload VARCHAR NOT NULL,
+                posicao BIGINT
+            )
+        ''')
+        self.con.execute('''
+            CREATE TABLE IF NOT EXISTS budget_months_raw (
+                budget_id BIGINT PRIMARY KEY,
+                payload VARCHAR NOT NULL
+            )
+        ''')
+        # Bancos criados antes das colunas de posição: budget_raw recebe a ordem
+        # de gravação atual e as tabelas tipadas são convertidas de novo, uma única vez
+        migrar_posicoes = 'posicao' not in self._colunas('budget_raw')
+        if migrar_posicoes:
+            self.con.execute('ALTER TABLE budget_raw ADD COLUMN posicao BIGINT')
+            self.con.execute('UPDATE budget_raw SET posicao = rowid')
+            self.con.execute('DROP TABLE IF EXISTS budget')
+            self.con.execute('DROP TABLE IF EXISTS budget_months')
+        # Bancos criados antes das tabelas tipadas são convertidos aqui, uma única vez
+        self.con.execute(f'CREATE TABLE IF NOT EXISTS budget AS {SQL_BUDGET_TIPADO}')
+        self.con.execute(f'CREATE TABLE IF NOT EXISTS budget_months AS {SQL_MESES_TIPADO}')
+        if migrar_posicoes and self._colunas('geral'):
+            self.con.execute(f'CREATE OR REPLACE TABLE geral AS {SQL_GERAL}')
+        # Agregação da controladoria, mantida a cada gravação (ver _atualizar_grupos)
+        self.con.execute(f'CREATE TABLE IF NOT EXISTS grupo AS {SQL_GRUPO_AGREGADO}')
+        self.con.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                chave VARCHAR PRIMARY KEY,
+                valor VARCHAR
+            )
+        ''')
+
+    def _colunas(self, tabela):
+        return {
+            coluna for (coluna,) in self.con.execute(
+                'SELECT column_name FROM duckdb_columns() WHERE table_name = ?', [tabela]
+            ).fetchall()
+        }
+
+    def comparar(self, budget, ciclos=None):
+        # Compara os orçamentos da API com os armazenados.
+        # Devolve as listas de IDs novos, alterados e removidos. Com ciclos (lista
+        # de cycleId), a busca na API cobriu só esses ciclos: orçamentos de outros
+        # ciclos guardados no banco não contam como removidos.
+        armazenados = {
+            budget_id: (hash_armazenado, ciclo)
+            for budget_id, hash_armazenado, ciclo in self.con.execute(
+                'SELECT r.id, r.hash, b.cycleId FROM budget_raw r LEFT JOIN budget b ON b.id = r.id'
+            ).fetchall()
+        }
+        atuais = {budget_entry['id']: hash_orcamento(budget_entry) for budget_entry in budget}
+
+        novos = [budget_id for budget_id in atuais if budget_id not in armazenados]
+        alterados = [
+            budget_id for budget_id, hash_atual in atuais.items()
+            if budget_id in armazenados and armazenados[budget_id][0] != hash_atual
+        ]
+        removidos = [
+            budget_id for budget_id, (_, ciclo) in armazenados.items()
+            if budget_id not in atuais and (not ciclos or ciclo in ciclos)
+        ]
+        return novos, alterados, removidos
+
+    def ciclos(self, budget_ids=None):
+        # cycleId dos orçamentos guardados no banco (ou só dos budget_ids informados)
+        if budget_ids is None:
+            return {ciclo for (ciclo,) in self.con.execute('SELECT DISTINCT cycleId FROM budget').fetchall()}
+        return {
+            ciclo for (ciclo,) in self.con.execute(
+                'SELECT DISTINCT cycleId FROM budget WHERE list_contains(?, id)', [list(budget_ids)]
+            ).fetchall()
+        }
+
+    def _registrar_ids(self, budget_ids):
+        import pandas as pd
+
+        self.con.register('ids_alterados', pd.DataFrame({'id': pd.Series(list(budget_ids), dtype='int64')}))
+
+    def _excluir_ids_alterados(self, tabelas_raw=True):
+        if tabelas_raw:
+            self.con.execute('DELETE FROM budget_raw WHERE id IN (SELECT id FROM ids_alterados)')
+            self.con.execute('DELETE FROM budget_months_raw WHERE budget_id IN (SELECT id FROM ids_alterados)')
+        self.con.execute('DELETE FROM budget WHERE id IN (SELECT id FROM ids_alterados)')
+        self.con.execute('DELETE FROM budget_months WHERE budgetId IN (SELECT id FROM ids_alterados)')
+
+    def _iniciar_grupos(self):
+        # Tabela temporária com as chaves dos grupos a recalcular na transação
+        self.con.execute(
+            f'CREATE OR REPLACE TEMP TABLE grupos_afetados AS '
+            f'SELECT {", ".join(CHAVES_GRUPO)} FROM grupo LIMIT 0'
+        )
+        self._marcar_grupos()
+
+    def _marcar_grupos(self):
+        # Registra os grupos da controladoria em que os orçamentos de
+        # 'ids_alterados' aparecem. Chamado antes da exclusão (grupos antigos) e
+        # depois da inserção (grupos novos).
+        self.con.execute(f'''
+            INSERT INTO grupos_afetados
+            SELECT DISTINCT {', '.join(CHAVES_GRUPO)}
+            FROM ({_grupo_restrito('b.id IN (SELECT id FROM ids_alterados)')})
+        ''')
+
+    def _atualizar_grupos(self):
+        # Recalcula, a partir da junção, apenas os grupos marcados. Cada grupo
+        # é somado por completo: entram todos os orçamentos do mesmo ano,
+        # fornecedor e contrato, e não só os alterados.
+        self.con.execute(f'DELETE FROM grupo g USING grupos_afetados a WHERE {_mesmo_grupo("g", "a")}')
+        orcamentos_afetados = '''
+            b.id IN (
+                SELECT o.id
+                FROM budget o
+                JOIN (SELECT DISTINCT ANO, COD_FORNECEDOR, "Nº CONTRATO" FROM grupos_afetados) a
+                  ON o.cycle_budgetYear IS NOT DISTINCT FROM a.ANO
+                 AND o.supplier_code IS NOT DISTINCT FROM a.COD_FORNECEDOR
+                 AND o.contractNumber IS NOT DISTINCT FROM a."Nº CONTRATO"
+            )
+        '''
+        self.con.execute(f'''
+            INSERT INTO grupo
+            SELECT g.*
+            FROM ({_grupo_restrito(orcamentos_afetados)}) g
+            SEMI JOIN (SELECT DISTINCT * FROM grupos_afetados) a ON {_mesmo_grupo("g", "a")}
+        ''')
+        self.con.execute('DROP TABLE grupos_afetados')
+
+    def remover(self, budget_ids):
+        if not budget_ids:
+            return
+        self._registrar_ids(budget_ids)
+        self.con.execute('BEGIN TRANSACTION')
+        self._iniciar_grupos()
+        self._excluir_ids_alterados()
+        self._atualizar_grupos()
+        self.con.execute('COMMIT')
+        self.con.unregister('ids_alterados')
+
+    def receber_meses(self, tamanho_lote=None):
+        # Destino dos meses durante a coleta: as respostas são gravadas no banco
+        # em lotes, à medida que chegam, em vez de mantidas em memória até o fim
+        return MesesRecebidos(self.con, tamanho_lote)
+
+    def salvar(self, budget_entries, meses_por_orcamento):
+        # Grava (ou substitui) os orçamentos e os respectivos meses.
+        # meses_por_orcamento traz o corpo JSON de cada resposta, gravado como veio
+        # da API: um MesesRecebidos (preenchido durante a coleta) ou um dicionário
+        # {budget_id: corpo JSON}. Orçamentos sem meses obtidos não são gravados,
+        # para serem buscados de novo na próxima sincronização.
+        budget_entries = [b for b in budget_entries if b['id'] in meses_por_orcamento]
+        if not budget_entries:
+            return
+
+        if not isinstance(meses_por_orcamento, MesesRecebidos):
+            recebidos = self.receber_meses()
+            recebidos.update(meses_por_orcamento)
+            meses_por_orcamento = recebidos
+        meses_por_orcamento.gravar_lote()
+
+        # pandas só é carregado quando há dados a gravar (não ao reaproveitar o snapshot)
+        import pandas as pd
+
+        # Orçamentos novos entram depois dos já gravados; os alterados mantêm a posição
+        inicio = self.con.execute('SELECT COALESCE(MAX(posicao) + 1, 0) FROM budget_raw').fetchone()[0]
+        novos_budget = pd.DataFrame({
+            'posicao': range(inicio, inicio + len(budget_entries)),
+            'id': [b['id'] for b in budget_entries],
+            'hash': [hash_orcamento(b) for b in budget_entries],
+            'payload': [json.dumps(b, ensure_ascii=False) for b in budget_entries],
+        })
+
+        self._registrar_ids(novos_budget['id'])
+        self.con.register('novos_budget', novos_budget)
+        self.con.execute('BEGIN TRANSACTION')
+        self._iniciar_grupos()
+        # Nas tabelas raw (com chave primária) a substituição é feita pelo INSERT OR
+        # REPLACE: o DuckDB não aceita excluir e inserir de novo a mesma chave
+        # dentro de uma transação
+        self._excluir_ids_alterados(tabelas_raw=False)
+        self.con.execute('''
+            INSERT OR REPLACE INTO budget_raw
+            SELECT n.id, n.hash, n.payload, COALESCE(r.posicao, n.posicao)
+            FROM novos_budget n
+            LEFT JOIN budget_raw r ON r.id = n.id
+            ORDER BY n.posicao
+        ''')
+        self.con.execute('''
+            INSERT OR REPLACE INTO budget_months_raw
+            SELECT m.budget_id, m.payload
+            FROM meses_recebidos m
+            JOIN novos_budget b ON b.id = m.budget_id
+            ORDER BY b.posicao
+        ''')
+        # Converte para a tabela tipada apenas os orçamentos recém gravados. Os
+        # meses já foram convertidos lote a lote durante a coleta.
+        self.con.execute(f'INSERT INTO budget {_somente_ids_alterados(SQL_BUDGET_TIPADO, "budget_raw", "id")}')
+        self.con.execute('''
+            INSERT INTO budget_months
+            SELECT m.*
+            FROM meses_recebidos_tipados m
+            JOIN novos_budget b ON b.id = m.budgetId
+            ORDER BY b.posicao, m.posicao
+        ''')
+        self._marcar_grupos()
+        self._atualizar_grupos()
+        self.con.execute('COMMIT')
+        self._avisar_nao_convertidos()
+        self.con.unregister('novos_budget')
+        self.con.unregister('ids_alterados')
+        meses_por_orcamento.descartar()
+
+    def _avisar_nao_convertidos(self):
+        # Um valor da API fora do tipo do esquema (ex.: "4,5" em um campo DOUBLE)
+        # fica NULL na conversão, sem erro, e um número em um campo de texto
+        # (ex.: um código) vira texto. Os orçamentos recém gravados são
+        # conferidos contra o JSON guardado, e cada campo afetado gera um aviso.
+        ficaram_vazios = 'não têm o tipo esperado e ficaram vazios nos relatórios'
+        viraram_texto = 'não são texto e foram gravados como texto nos relatórios'
+        verificacoes = [
+            (SQL_NAO_CONVERTIDOS_BUDGET, 'budget_raw', 'id', 'valores_nao_convertidos', ficaram_vazios),
+            (SQL_NAO_CONVERTIDOS_MESES, 'budget_months_raw', 'budget_id', 'valores_nao_convertidos', ficaram_vazios),
+            (SQL_NUMEROS_EM_TEXTO_BUDGET, 'budget_raw', 'id', 'valores_convertidos_texto', viraram_texto),
+            (SQL_NUMEROS_EM_TEXTO_MESES, 'budget_months_raw', 'budget_id', 'valores_convertidos_texto', viraram_texto),
+        ]
+        for sql, tabela_raw, coluna_id, metrica, efeito in verificacoes:
+            cursor = self.con.execute(_somente_ids_alterados(sql, tabela_raw, coluna_id))
+            for descricao, quantidade in zip(cursor.description, cursor.fetchone()):
+                if not quantidade:
+                    continue
+                campo = descricao[0]
+                metricas.incrementar(metrica, quantidade, rotulos={'campo': campo})
+                tqdm.write(
+                    f"Aviso: {quantidade} valor(es) do campo '{campo}' recebidos da API {efeito}. "
+                    f"Verifique o formato da API."
+                )
+
+    def atualizar_snapshot(self):
+        # Materializa df_geral na tabela 'geral', consumida pelos dois scripts,
+        # e registra o instante em que os dados foram obtidos da API
+        self.con.execute('BEGIN TRANSACTION')
+        self.con.execute(f'CREATE OR REPLACE TABLE geral AS {SQL_GERAL}')
+        self.con.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('snapshot_geral', ?)", [str(time.time())]
+        )
+        self.con.execute('COMMIT')
+
+    def idade_snapshot(self):
+        # Segundos desde a última atualização do snapshot (None se não existir)
+        registro = self.con.execute("SELECT valor FROM meta WHERE chave = 'snapshot_geral'").fetchone()
+        if registro is None:
+            return None
+        return time.time() - float(registro[0])
+
+    def data_snapshot(self):
+        # Instante (UTC) em que o snapshot foi gerado, usado como data dos arquivos
+        registro = self.con.execute("SELECT valor FROM meta WHERE chave = 'snapshot_geral'").fetchone()
+        if registro is None:
+            return None
+        return datetime.fromtimestamp(float(registro[0]), timezone.utc).replace(microsecond=0, tzinfo=None)
+
+    def df_geral(self):
+        return self.con.execute(SQL_VALIDACAO).fetchdf()
+
+    def close(self):
+        self.con.close()
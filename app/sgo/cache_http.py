@@ -0,0 +1,182 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from sgo import config
+from sgo.metricas import metricas
+
+# Cabeçalhos que não fazem sentido em uma resposta lida do cache: o corpo é
+# guardado já descomprimido e com o tamanho real
+_CABECALHOS_DESCARTADOS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+# Respostas gravadas entre duas podas do cache
+_GRAVACOES_POR_PODA = 500
+
+
+class CacheHTTP:
+    # Cache persistente das respostas da API SGO, por URL, em um arquivo SQLite
+    # com os corpos comprimidos (zlib). Respostas dentro da validade são
+    # devolvidas sem acessar a rede; as vencidas são revalidadas com
+    # If-None-Match/If-Modified-Since quando a API enviou ETag/Last-Modified.
+    # Acima do tamanho máximo, saem as respostas usadas há mais tempo (LRU).
+    def __init__(self, caminho=None, ttl_minutos=None, tamanho_maximo_mb=None):
+        self.caminho = caminho or config.CAMINHO_CACHE_HTTP
+        self.ttl = (config.TTL_CACHE_HTTP if ttl_minutos is None else ttl_minutos) * 60
+        self.tamanho_maximo = int(
+            (config.TAMANHO_CACHE_HTTP_MB if tamanho_maximo_mb is None else tamanho_maximo_mb) * 1024 * 1024
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+
+        # Uma conexão compartilhada pelas threads da coleta, protegida pelo lock
+        self._con = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._con.execute('PRAGMA journal_mode=WAL')
+        self._con.execute('PRAGMA synchronous=NORMAL')
+        self._con.execute('''
+            CREATE TABLE IF NOT EXISTS respostas (
+                url TEXT PRIMARY KEY,
+                cabecalhos TEXT NOT NULL,
+                corpo BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                armazenado_em REAL NOT NULL,
+                ultimo_acesso REAL NOT NULL,
+                tamanho INTEGER NOT NULL
+            )
+        ''')
+        self._lock = threading.Lock()
+        self._gravacoes = 0
+
+        self.acertos = 0
+        self.revalidados = 0
+        self.faltas = 0
+        self.removidos = 0
+
+    def _ler(self, url):
+        with self._lock:
+            return self._con.execute(
+                'SELECT cabecalhos, corpo, etag, last_modified, armazenado_em FROM respostas WHERE url = ?',
+                [url],
+            ).fetchone()
+
+    def valido(self, url):
+        # A resposta está no cache e dentro da validade (não precisa de rede)
+        registro = self._ler(url)
+        return registro is not None and time.time() - registro[4] <= self.ttl
+
+    def consultar(self, url, revalidar=False):
+        # Devolve (resposta, cabeçalhos condicionais):
+        #   dentro da validade:        (Response, None), sem acessar a rede;
+        #   vencida, com ETag/Last-Modified: (Response guardada, {If-None-Match...}),
+        #     a ser devolvida se a API responder 304 (ver revalidado);
+        #   ausente ou não revalidável: (None, None).
+        # Com revalidar=True, a resposta é tratada como vencida mesmo dentro da validade.
+        registro = self._ler(url)
+        if registro is None:
+            return None, None
+        cabecalhos, corpo, etag, last_modified, armazenado_em = registro
+        if not revalidar and time.time() - armazenado_em <= self.ttl:
+            self._registrar_acerto(url, 'acerto')
+            return self._resposta(url, cabecalhos, corpo), None
+
+        condicionais = {}
+        if etag:
+            condicionais['If-None-Match'] = etag
+        if last_modified:
+            condicionais['If-Modified-Since'] = last_modified
+        if not condicionais:
+            return None, None
+        return self._resposta(url, cabecalhos, corpo), condicionais
+
+    def revalidado(self, url):
+        # A API respondeu 304: a resposta guardada volta a valer por mais um TTL
+        with self._lock:
+            self._con.execute('UPDATE respostas SET armazenado_em = ? WHERE url = ?', [time.time(), url])
+        self._registrar_acerto(url, 'revalidado')
+
+    def guardar(self, url, response):
+        # Guarda uma resposta 200 obtida da rede
+        cabecalhos = {
+            nome: valor for nome, valor in response.headers.items()
+            if nome.lower() not in _CABECALHOS_DESCARTADOS
+        }
+        corpo = zlib.compress(response.content, 6)
+        agora = time.time()
+        with self._lock:
+            self.faltas += 1
+            self._con.execute(
+                'INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    url, json.dumps(cabecalhos), corpo, response.headers.get('ETag'),
+                    response.headers.get('Last-Modified'), agora, agora, len(corpo),
+                ],
+            )
+            self._con.commit()
+            self._gravacoes += 1
+            podar = self._gravacoes % _GRAVACOES_POR_PODA == 0
+        metricas.incrementar('cache_http', rotulos={'resultado': 'falta'})
+        if podar:
+            self.podar()
+
+    def _registrar_acerto(self, url, resultado):
+        with self._lock:
+            if resultado == 'acerto':
+                self.acertos += 1
+            else:
+                self.revalidados += 1
+            self._con.execute('UPDATE respostas SET ultimo_acesso = ? WHERE url = ?', [time.time(), url])
+            self._con.commit()
+        metricas.incrementar('cache_http', rotulos={'resultado': resultado})
+
+    @staticmethod
+    def _resposta(url, cabecalhos, corpo):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(json.loads(cabecalhos))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = zlib.decompress(corpo)
+        response.reason = 'OK'
+        # Resposta lida do cache, sem passar pela rede
+        response.do_cache = True
+        return response
+
+    def podar(self):
+        # Remove as respostas vencidas que não podem ser revalidadas e, acima do
+        # tamanho máximo, as usadas há mais tempo
+        with self._lock:
+            antes = self._con.total_changes
+            self._con.execute(
+                'DELETE FROM respostas WHERE armazenado_em < ? AND etag IS NULL AND last_modified IS NULL',
+                [time.time() - self.ttl],
+            )
+            self._con.execute('''
+                DELETE FROM respostas WHERE url IN (
+                    SELECT url FROM (
+                        SELECT url, SUM(tamanho) OVER (ORDER BY ultimo_acesso DESC, url) AS acumulado
+                        FROM respostas
+                    )
+                    WHERE acumulado > ?
+                )
+            ''', [self.tamanho_maximo])
+            self._con.commit()
+            self.removidos += self._con.total_changes - antes
+
+    def resumo(self):
+        consultas = self.acertos + self.revalidados + self.faltas
+        taxa = (self.acertos + self.revalidados) / consultas * 100 if consultas else 0.0
+        return (
+            f"Cache HTTP: {self.acertos} acertos, {self.revalidados} revalidados (304), "
+            f"{self.faltas} faltas ({taxa:.1f}% servidos pelo cache), {self.removidos} removidos."
+        )
+
+    def fechar(self):
+        self.podar()
+        with self._lock:
+            self._con.close()
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+
+from sgo import config
+from sgo.armazenamento import hash_orcamento
+
+
+def caminho_checkpoint(caminho_banco):
+    # Checkpoint do banco local, ao lado dele (sgo.duckdb -> sgo_checkpoint_coleta.jsonl).
+    # Execuções com outro --banco, ou o ServicoSGO.py, não apagam o checkpoint
+    # umas das outras.
+    if config.CAMINHO_CHECKPOINT:
+        return config.CAMINHO_CHECKPOINT
+    if caminho_banco == ':memory:':
+        return os.path.join(tempfile.gettempdir(), f'sgo_checkpoint_coleta_{os.getpid()}.jsonl')
+    base, _ = os.path.splitext(os.path.abspath(caminho_banco))
+    return f'{base}_checkpoint_coleta.jsonl'
+
+
+class CheckpointColeta:
+    # Arquivo JSONL, apenas com acréscimos, com os meses de cada orçamento à
+    # medida que chegam da API. Se a execução for interrompida, a opção
+    # --resume reaproveita o que já foi obtido e busca apenas o restante.
+    def __init__(self, caminho):
+        self.caminho = caminho
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        self._arquivo = None
+
+    def carregar(self):
+        # Devolve {budget_id: (hash do orçamento, corpo JSON dos meses)} do checkpoint existente
+        obtidos = {}
+        if not os.path.exists(self.caminho):
+            return obtidos
+
+        with open(self.caminho, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    # Última linha incompleta de uma execução interrompida
+                    continue
+                obtidos[registro['budgetId']] = (
+                    registro['hash'], json.dumps(registro['months'], ensure_ascii=False)
+                )
+        return obtidos
+
+    def pendentes(self, budget):
+        # Separa os orçamentos que ainda precisam ser buscados dos que já estão
+        # no checkpoint (com o mesmo conteúdo). Devolve (pendentes, {budget_id: corpo JSON}).
+        obtidos = self.carregar()
+        pendentes = []
+        ja_obtidos = {}
+        for budget_entry in budget:
+            registro = obtidos.get(budget_entry['id'])
+            if registro is not None and registro[0] == hash_orcamento(budget_entry):
+                ja_obtidos[budget_entry['id']] = registro[1]
+            else:
+                pendentes.append(budget_entry)
+        return pendentes, ja_obtidos
+
+    def registrar(self, budget_entry, budget_months):
+        # budget_months é o corpo JSON da resposta, gravado sem ser decodificado.
+        # Quebras de linha fora de strings JSON são apenas espaço e são removidas
+        # para manter um registro por linha.
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        meses = budget_months.replace('\r', ' ').replace('\n', ' ')
+        self._arquivo.write(
+            f'{{"budgetId": {json.dumps(budget_entry["id"])}, '
+            f'"hash": "{hash_orcamento(budget_entry)}", "months": {meses}}}\n'
+        )
+        self._arquivo.flush()
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def limpar(self):
+        # Descarta o checkpoint (nova coleta completa ou coleta concluída sem falhas)
+        self.fechar()
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
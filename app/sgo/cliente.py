@@ -0,0 +1,149 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from sgo import config
+from sgo.metricas import metricas
+
+
+class ClienteSGO:
+    # Sessão HTTP compartilhada para as chamadas à API SGO.
+    # Reaproveita as conexões (keep-alive), negocia compressão (gzip e, se
+    # instalado, brotli) e aplica timeout em todas as requisições.
+    # Com um CacheHTTP, as respostas válidas no cache não passam pela rede.
+    def __init__(self, headers, max_conexoes=None, timeout=None, cache=None):
+        max_conexoes = max_conexoes or config.MAX_WORKERS
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+        # Um pool por host, com uma conexão para cada thread da coleta
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_conexoes, pool_block=True)
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+
+        self.timeout = timeout or (config.TIMEOUT_CONEXAO, config.TIMEOUT_LEITURA)
+        self.cache = cache
+
+        self.requisicoes = 0
+        self.bytes_rede = 0
+        self.bytes_conteudo = 0
+        self._lock = threading.Lock()
+
+    def url_completa(self, url, params=None):
+        # URL com a query string, usada como chave do cache
+        return requests.Request('GET', url, params=params).prepare().url
+
+    def em_cache(self, url, params=None):
+        # A resposta pode ser servida pelo cache sem acessar a rede (nem
+        # aguardar o limitador de taxa)
+        return self.cache is not None and self.cache.valido(self.url_completa(url, params))
+
+    def get(self, url, revalidar=False, **kwargs):
+        # revalidar=True sempre consulta a API, mesmo com a resposta dentro da
+        # validade do cache, e só reaproveita o corpo guardado em um 304
+        if self.cache is None:
+            return self._get_rede(url, **kwargs)
+
+        chave = self.url_completa(url, kwargs.get('params'))
+        guardada, condicionais = self.cache.consultar(chave, revalidar)
+        if guardada is not None and condicionais is None:
+            return guardada
+        if condicionais:
+            kwargs['headers'] = {**kwargs.get('headers', {}), **condicionais}
+
+        response = self._get_rede(url, **kwargs)
+        if response.status_code == 304 and guardada is not None:
+            # Revalidada pela rede: vale como resposta da API (com os cabeçalhos
+            # de limite de taxa do 304) e não como acerto direto do cache
+            self.cache.revalidado(chave)
+            guardada.headers.update(response.headers)
+            guardada.do_cache = False
+            return guardada
+        if response.status_code == 200:
+            self.cache.guardar(chave, response)
+        return response
+
+    def _get_rede(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        inicio = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception as err:
+            metricas.incrementar('erros_requisicao', rotulos={'tipo': type(err).__name__})
+            raise
+
+        # Lê o corpo agora para contabilizar os bytes comprimidos que vieram pela rede
+        bytes_conteudo = len(response.content)
+        try:
+            bytes_rede = response.raw.tell()
+        except (AttributeError, OSError):
+            bytes_rede = bytes_conteudo
+
+        with self._lock:
+            self.requisicoes += 1
+            self.bytes_rede += bytes_rede
+            self.bytes_conteudo += bytes_conteudo
+
+        # Latência até o corpo completo ter sido recebido
+        metricas.observar('requisicao_segundos', time.perf_counter() - inicio)
+        metricas.incrementar('respostas_http', rotulos={'status': response.status_code})
+        metricas.incrementar('bytes_rede', bytes_rede)
+        metricas.incrementar('bytes_conteudo', bytes_conteudo)
+
+        return response
+
+    def conexoes_abertas(self):
+        # Total de conexões TCP/TLS criadas pelos pools desde o início
+        pools = self._adapter.poolmanager.pools
+        total = 0
+        for chave in pools.keys():
+            pool = pools.get(chave)
+            if pool is not None:
+                total += pool.num_connections
+        return total
+
+    def estatisticas(self):
+        conexoes = self.conexoes_abertas()
+        estatisticas = {
+            'requisicoes': self.requisicoes,
+            'conexoes_novas': conexoes,
+            'conexoes_reutilizadas': max(0, self.requisicoes - conexoes),
+            'bytes_rede': self.bytes_rede,
+            'bytes_conteudo': self.bytes_conteudo,
+        }
+        if self.cache is not None:
+            estatisticas.update({
+                'cache_acertos': self.cache.acertos,
+                'cache_revalidados': self.cache.revalidados,
+                'cache_faltas': self.cache.faltas,
+            })
+        return estatisticas
+
+    def resumo(self):
+        if self.cache is not None:
+            # Poda feita antes do resumo, para que as remoções apareçam nele
+            self.cache.podar()
+        est = self.estatisticas()
+        return (
+            f"Conexões HTTP: {est['requisicoes']} requisições, {est['conexoes_novas']} conexões abertas, "
+            f"{est['conexoes_reutilizadas']} reaproveitadas. "
+            f"Tráfego: {est['bytes_rede'] / 1024 / 1024:.2f} MB na rede, "
+            f"{est['bytes_conteudo'] / 1024 / 1024:.2f} MB descomprimidos."
+        ) + (f"\n{self.cache.resumo()}" if self.cache is not None else '')
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.fechar()
+            self.cache = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import requests
+from tqdm import tqdm
+
+from sgo import config
+from sgo.limitador import ControladorTaxa
+from sgo.metricas import metricas
+
+
+class ErroAPI(Exception):
+    # Erro que impede a continuação da coleta (ex.: token de acesso inválido)
+    def __init__(self, budget_id, status_code):
+        super().__init__(
+            f"Erro ao obter os detalhes do orçamento para o budgetId {budget_id}: {status_code}"
+        )
+        self.budget_id = budget_id
+        self.status_code = status_code
+
+
+@dataclass
+class FalhaOrcamento:
+    # Orçamento que não pôde ser obtido e ficou de fora dos relatórios
+    budget_id: int
+    status_code: Optional[int]  # None em erros de conexão ou tempo esgotado
+    tentativas: int
+    motivo: str
+
+
+# Status em que a API pede para aguardar e tentar novamente
+STATUS_REPETIR = (429, 503)
+
+# Status que interrompem a coleta, pois todas as demais requisições falhariam também
+STATUS_FATAIS = (401, 403)
+
+
+class _Contador:
+    def __init__(self):
+        self.valor = 0
+        self._lock = threading.Lock()
+
+    def incrementar(self):
+        with self._lock:
+            self.valor += 1
+
+
+def _buscar_meses(budget_id, api_budget_months, cliente, controlador, requisicoes, max_tentativas):
+    tentativas = 0
+
+    url = f"{api_budget_months}?budgetId={budget_id}"
+
+    while True:
+        # Respostas válidas no cache HTTP não acessam a rede nem aguardam o limitador
+        if not cliente.em_cache(url):
+            controlador.adquirir()
+            requisicoes.incrementar()
+        try:
+            response_months = cliente.get(url)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as conn_err:
+            # Falhas de conexão e timeouts também são tentados novamente
+            tentativas += 1
+            metricas.incrementar('novas_tentativas', rotulos={'motivo': 'conexao'})
+            espera = controlador.registrar_limite(None, tentativas)
+            if tentativas >= max_tentativas:
+                tqdm.write(f"Falha ao obter os dados para o orçamento {budget_id} após {max_tentativas} tentativas.")
+                return None, FalhaOrcamento(budget_id, None, tentativas, f"Erro de conexão: {conn_err}")
+            tqdm.write(
+                f"Erro de conexão para o budgetId {budget_id}. "
+                f"Tentativa {tentativas} de {max_tentativas}. Aguardando {espera:.1f}s antes de tentar novamente."
+            )
+            continue
+
+        if response_months.status_code == 200:
+            if not getattr(response_months, 'do_cache', False):
+                controlador.registrar_sucesso(response_months)
+            # O corpo JSON segue como texto, para ser convertido direto no DuckDB
+            budget_months = response_months.text
+            tqdm.write(f"Itens do orçamento do ID: {budget_id}, obtidos com sucesso.")
+            return budget_months, None
+
+        elif response_months.status_code in STATUS_REPETIR:
+            tentativas += 1
+            metricas.incrementar('novas_tentativas', rotulos={'motivo': response_months.status_code})
+            espera = controlador.registrar_limite(response_months, tentativas)
+            if tentativas >= max_tentativas:
+                break
+            tqdm.write(
+                f"Tempo limite da API excedido para o budgetId {budget_id}. "
+                f"Tentativa {tentativas} de {max_tentativas}. Aguardando {espera:.1f}s antes de tentar novamente."
+            )
+
+        elif response_months.status_code in STATUS_FATAIS:
+            raise ErroAPI(budget_id, response_months.status_code)
+
+        else:
+            tqdm.write(f"Erro ao obter os detalhes do orçamento para o budgetId {budget_id}: {response_months.status_code}")
+            return None, FalhaOrcamento(
+                budget_id, response_months.status_code, tentativas + 1,
+                f"Erro HTTP {response_months.status_code}",
+            )
+
+    tqdm.write(f"Falha ao obter os dados para o orçamento {budget_id} após {max_tentativas} tentativas.")
+    falha = FalhaOrcamento(
+        budget_id=budget_id,
+        status_code=response_months.status_code,
+        tentativas=tentativas,
+        motivo=(
+            "Limite de requisições da API excedido" if response_months.status_code == 429
+            else "Serviço da API indisponível"
+        ),
+    )
+    return None, falha
+
+
+def buscar_meses_por_orcamento(budget, api_budget_months, cliente, checkpoint=None,
+                               max_workers=None, max_req_por_segundo=None, max_tentativas=None,
+                               req_por_segundo_inicial=None, meses_por_orcamento=None):
+    # Busca os meses de todos os orçamentos com N requisições em paralelo.
+    # A taxa de requisições se adapta às respostas da API, até o teto configurado.
+    # Cada orçamento obtido é gravado no checkpoint (se informado) assim que chega.
+    # O corpo JSON de cada resposta vai para meses_por_orcamento assim que chega:
+    # um dicionário {budget_id: corpo JSON} (padrão) ou o destino em lotes de
+    # ArmazemSGO.receber_meses, que não guarda as respostas em memória.
+    # Devolve meses_por_orcamento e a lista de falhas, na ordem da lista de orçamentos.
+    max_workers = max_workers or config.MAX_WORKERS
+    max_req_por_segundo = max_req_por_segundo or config.MAX_REQ_POR_SEGUNDO
+    max_tentativas = max_tentativas or config.MAX_TENTATIVAS
+    req_por_segundo_inicial = req_por_segundo_inicial or config.REQ_POR_SEGUNDO_INICIAL
+
+    controlador = ControladorTaxa(
+        taxa_inicial=min(req_por_segundo_inicial, max_req_por_segundo),
+        taxa_maxima=max_req_por_segundo,
+    )
+    requisicoes = _Contador()
+    if meses_por_orcamento is None:
+        meses_por_orcamento = {}
+    falhas_por_posicao = {}
+    inicio = time.perf_counter()
+
+    # Barra de progresso com tqdm
+    with tqdm(total=len(budget), desc="Processando Orçamentos") as pbar:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futuros = {
+                executor.submit(
+                    _buscar_meses, budget_entry['id'], api_budget_months, cliente,
+                    controlador, requisicoes, max_tentativas,
+                ): posicao
+                for posicao, budget_entry in enumerate(budget)
+            }
+            for futuro in as_completed(futuros):
+                posicao = futuros[futuro]
+                budget_months, falha = futuro.result()
+                if falha is not None:
+                    falhas_por_posicao[posicao] = falha
+                else:
+                    meses_por_orcamento[budget[posicao]['id']] = budget_months or '[]'
+                    if checkpoint is not None:
+                        checkpoint.registrar(budget[posicao], budget_months or '[]')
+                pbar.update(1)  # Atualiza a barra de progresso após o término de cada orçamento
+        finally:
+            # Em caso de erro, descarta as requisições que ainda não começaram
+            executor.shutdown(wait=True, cancel_futures=True)
+            if checkpoint is not None:
+                checkpoint.fechar()
+
+    duracao = time.perf_counter() - inicio
+
+    falhas = [falhas_por_posicao[posicao] for posicao in sorted(falhas_por_posicao)]
+
+    if duracao > 0:
+        tqdm.write(
+            f"\nVazão da coleta: {len(budget)} orçamentos e {requisicoes.valor} requisições "
+            f"em {duracao:.1f}s ({len(budget) / duracao:.2f} orçamentos/s, "
+            f"{requisicoes.valor / duracao:.2f} req/s, {controlador.total_429} respostas 429, "
+            f"taxa final {controlador.taxa:.2f} req/s)."
+        )
+
+    return meses_por_orcamento, falhas
+
+
+def salvar_falhas(falhas, pasta_arquivos, nome_arquivo='Falhas Coleta SGO.xlsx'):
+    # Salva os orçamentos que ficaram de fora dos relatórios em uma planilha própria.
+    # Sem falhas, remove a planilha de uma execução anterior.
+    file_path_falhas = os.path.join(pasta_arquivos, nome_arquivo)
+
+    if not falhas:
+        if os.path.exists(file_path_falhas):
+            os.remove(file_path_falhas)
+        return None
+
+    import pandas as pd
+
+    pd.DataFrame([asdict(falha) for falha in falhas]).to_excel(file_path_falhas, index=False)
+    tqdm.write(
+        f"\nAtenção: {len(falhas)} orçamento(s) não foram obtidos e ficaram de fora dos relatórios. "
+        f"Detalhes em {file_path_falhas}."
+    )
+    return file_path_falhas
@@ -0,0 +1,96 @@
+import os
+import shutil
+
+from sgo.consultas import SQL_GRUPO, SQL_VALIDACAO
+
+# Formatos colunares disponíveis para os snapshots:
+# - parquet: arquivos Parquet particionados (Hive), gravados pelo próprio DuckDB
+# - arrow: um arquivo Arrow IPC por tabela, que pode ser mapeado em memória (requer pyarrow)
+FORMATOS = ('parquet', 'arrow')
+
+# Tabelas exportadas: nome -> (consulta, colunas de partição do Parquet)
+TABELAS = {
+    'budget': ('SELECT * FROM budget', ['cycle_budgetYear']),
+    'budget_months': (
+        '''
+        SELECT bm.*, b.cycle_budgetYear
+        FROM budget_months bm
+        JOIN budget b ON b.id = bm.budgetId
+        ''',
+        ['cycle_budgetYear', 'budgetApportionmentItem_sector_company_name'],
+    ),
+    'df_geral': (SQL_VALIDACAO, ['Ano', 'EMPRESA']),
+    'df_grupo': (SQL_GRUPO, ['ANO']),
+}
+
+# Linhas por lote na gravação em Arrow IPC
+TAMANHO_LOTE = 100000
+
+
+def _sql_texto(valor):
+    return "'" + valor.replace("'", "''") + "'"
+
+
+def _exportar_parquet(con, sql, destino, particoes):
+    colunas = ', '.join(f'"{coluna}"' for coluna in particoes)
+    con.execute(f'''
+        COPY ({sql}) TO {_sql_texto(destino)}
+        (FORMAT PARQUET, PARTITION_BY ({colunas}), COMPRESSION ZSTD)
+    ''')
+
+
+def _exportar_arrow(con, sql, destino, particoes):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("O formato 'arrow' requer o pacote pyarrow (pip install pyarrow).") from None
+
+    os.makedirs(destino)
+    # Os lotes vêm do DuckDB já no formato Arrow, sem conversão para objetos Python
+    leitor = con.execute(sql).fetch_record_batch(TAMANHO_LOTE)
+    with pa.OSFile(os.path.join(destino, 'dados.arrow'), 'wb') as arquivo:
+        with pa.ipc.new_file(arquivo, leitor.schema) as escritor:
+            for lote in leitor:
+                escritor.write_batch(lote)
+
+
+_EXPORTADORES = {
+    'parquet': _exportar_parquet,
+    'arrow': _exportar_arrow,
+}
+
+
+def exportar_colunar(con, pasta, formato='parquet'):
+    # Grava budget, budget_months, df_geral e df_grupo em formato colunar em
+    # 'pasta', uma subpasta por tabela. Cada tabela é gravada em uma pasta
+    # temporária e só então substitui a anterior, para que os consumidores
+    # nunca leiam uma exportação pela metade.
+    if formato not in _EXPORTADORES:
+        raise ValueError(f"Formato colunar desconhecido: {formato}. Opções: {', '.join(FORMATOS)}.")
+    os.makedirs(pasta, exist_ok=True)
+
+    destinos = []
+    for nome, (sql, particoes) in TABELAS.items():
+        destino = os.path.join(pasta, nome)
+        temporario = destino + '.tmp'
+        anterior = destino + '.old'
+        # Sobras de uma exportação interrompida
+        for sobra in (temporario, anterior):
+            if os.path.exists(sobra):
+                shutil.rmtree(sobra)
+
+        try:
+            _EXPORTADORES[formato](con, sql, temporario, particoes)
+        except Exception:
+            shutil.rmtree(temporario, ignore_errors=True)
+            raise
+
+        # A exportação anterior só é apagada depois da troca: entre as duas
+        # renomeações (instantâneas) é o único momento sem a pasta da tabela
+        if os.path.exists(destino):
+            os.replace(destino, anterior)
+        os.replace(temporario, destino)
+        shutil.rmtree(anterior, ignore_errors=True)
+        destinos.append(destino)
+
+    return destinos
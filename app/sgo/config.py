@@ -0,0 +1,82 @@
+import os
+
+# Configurações da coleta, podem ser sobrescritas por variáveis de ambiente
+
+# Número de requisições simultâneas para a API de meses dos orçamentos
+MAX_WORKERS = int(os.environ.get('SGO_WORKERS', 8))
+
+# Teto de requisições por segundo enviadas para a API SGO
+MAX_REQ_POR_SEGUNDO = float(os.environ.get('SGO_MAX_RPS', 10))
+
+# Taxa inicial da coleta; ela sobe a cada sucesso e cai a cada 429, até o teto acima
+REQ_POR_SEGUNDO_INICIAL = float(os.environ.get('SGO_RPS_INICIAL', 2))
+
+# Número máximo de tentativas para o caso de 429
+MAX_TENTATIVAS = int(os.environ.get('SGO_MAX_TENTATIVAS', 6))
+
+# Tempo máximo (segundos) para abrir a conexão e para aguardar a resposta da API
+TIMEOUT_CONEXAO = float(os.environ.get('SGO_TIMEOUT_CONEXAO', 10))
+TIMEOUT_LEITURA = float(os.environ.get('SGO_TIMEOUT_LEITURA', 60))
+
+# Execução sem interação (agendada): sem a animação de abertura e sem as pausas finais
+HEADLESS = os.environ.get('SGO_HEADLESS', '').lower() in ('1', 'true', 'sim', 'yes')
+
+# Ciclos (cycleId) buscados na API, separados por vírgula (ex.: "5,6"); vazio usa o padrão da API
+CICLOS = [int(ciclo) for ciclo in os.environ.get('SGO_CICLOS', '').replace(' ', '').split(',') if ciclo] or None
+
+# Profundidade das filas do modo --fluxo de RateiosSGO.py (respostas de meses e
+# planilhas aguardando gravação); limita a memória usada pelas etapas em andamento
+PROFUNDIDADE_FILA = int(os.environ.get('SGO_PROFUNDIDADE_FILA', 64))
+
+# Banco DuckDB local que guarda os dados da API entre execuções
+CAMINHO_BANCO = os.environ.get(
+    'SGO_BANCO', os.path.join(os.path.expanduser('~'), '.sgo', 'sgo.duckdb')
+)
+
+# Checkpoint da coleta em andamento, usado pela opção --resume. Por padrão, cada
+# banco local tem o seu, ao lado dele (ver sgo/checkpoint.py:caminho_checkpoint)
+CAMINHO_CHECKPOINT = os.environ.get('SGO_CHECKPOINT') or None
+
+# Cache em disco das respostas da API (desenvolvimento e reexecuções no mesmo dia).
+# SGO_CACHE_HTTP=1 usa o arquivo padrão abaixo, um caminho usa esse arquivo e vazio desativa.
+CAMINHO_CACHE_HTTP = os.path.join(os.path.dirname(CAMINHO_BANCO), 'cache_http.sqlite')
+_cache_http = os.environ.get('SGO_CACHE_HTTP', '')
+CACHE_HTTP = (
+    CAMINHO_CACHE_HTTP if _cache_http.lower() in ('1', 'true', 'sim', 'yes')
+    else _cache_http or None
+)
+
+# Validade (minutos) das respostas do cache; depois dela, são revalidadas com
+# ETag/Last-Modified quando a API os informa, ou buscadas de novo
+TTL_CACHE_HTTP = float(os.environ.get('SGO_CACHE_TTL', 720))
+
+# Tamanho máximo (MB, corpos comprimidos) do cache; acima dele saem as menos usadas recentemente
+TAMANHO_CACHE_HTTP_MB = float(os.environ.get('SGO_CACHE_MAX_MB', 512))
+
+# Validade (minutos) do snapshot de df_geral. Dentro desse prazo, os dois scripts
+# reaproveitam os dados do banco local sem consultar a API de novo.
+TTL_SNAPSHOT = float(os.environ.get('SGO_TTL_SNAPSHOT', 60))
+
+# Motor usado para gravar os relatórios Excel (pandas, openpyxl ou xlsxwriter)
+MOTOR_EXCEL = os.environ.get('SGO_MOTOR_EXCEL', 'openpyxl')
+
+# Motor usado para gravar as planilhas de rateio (xml ou openpyxl)
+MOTOR_RATEIO = os.environ.get('SGO_MOTOR_RATEIO', 'xml')
+
+# Serviço local de relatórios (ServicoSGO.py): porta HTTP e tamanho máximo (MB)
+# do cache em memória das planilhas já geradas
+PORTA_SERVICO = int(os.environ.get('SGO_SERVICO_PORTA', 8780))
+
+# Banco DuckDB do serviço. O DuckDB só permite um processo com o banco aberto para
+# escrita, então o serviço usa um banco próprio e os scripts continuam rodando com ele no ar
+CAMINHO_BANCO_SERVICO = os.environ.get(
+    'SGO_SERVICO_BANCO', os.path.join(os.path.dirname(CAMINHO_BANCO), 'servico.duckdb')
+)
+CACHE_SERVICO_MB = float(os.environ.get('SGO_SERVICO_CACHE_MB', 256))
+
+# Pasta para a exportação colunar (Parquet/Arrow) dos dados; vazia desativa
+PASTA_COLUNAR = os.environ.get('SGO_PASTA_COLUNAR') or None
+
+# Arquivos para as métricas da execução (relatório JSON e textfile do Prometheus); vazios desativam
+METRICAS_JSON = os.environ.get('SGO_METRICAS') or None
+METRICAS_PROMETHEUS = os.environ.get('SGO_METRICAS_PROMETHEUS') or None
@@ -0,0 +1,378 @@
+import json
+
+# Consultas SQL compartilhadas pelos relatórios do SGO
+
+# Esquema explícito dos campos da API usados pelos relatórios. Os JSON recebidos
+# são convertidos direto no DuckDB (from_json) para colunas tipadas, sem passar
+# por dicionários Python nem pd.json_normalize. Códigos e textos ficam como
+# VARCHAR, valores como DOUBLE.
+# Os códigos (*.code, codeCostCenter) e adjustmentMonth são tratados como texto:
+# um código pode ter zeros à esquerda ou letras, e o mês pode vir como nome.
+# Se a API enviar um número em um desses campos, ele chega aos relatórios como
+# texto ("123"), sem perda, e a conferência de ArmazemSGO._avisar_nao_convertidos
+# avisa (SQL_NUMEROS_EM_TEXTO_*) para que o tipo seja revisto aqui.
+CAMPOS_BUDGET = {
+    'active': 'BOOLEAN',
+    'id': 'BIGINT',
+    'contractNumber': 'VARCHAR',
+    'adjustmentMonth': 'VARCHAR',
+    'adjustmentPercentage': 'DOUBLE',
+    'value': 'DOUBLE',
+    'cycleId': 'BIGINT',
+    'supplier': {'code': 'VARCHAR', 'description': 'VARCHAR'},
+    'budgetAccount': {'code': 'VARCHAR', 'description': 'VARCHAR'},
+    'origin': {'description': 'VARCHAR'},
+    'levelSix': {'description': 'VARCHAR'},
+    'manager': {'description': 'VARCHAR'},
+    'apportionment': {'name': 'VARCHAR', 'description': 'VARCHAR'},
+    'cycle': {'budgetYear': 'INTEGER'},
+}
+
+CAMPOS_MESES = [{
+    'budgetId': 'BIGINT',
+    'january': 'DOUBLE', 'february': 'DOUBLE', 'march': 'DOUBLE', 'april': 'DOUBLE',
+    'may': 'DOUBLE', 'june': 'DOUBLE', 'july': 'DOUBLE', 'august': 'DOUBLE',
+    'september': 'DOUBLE', 'october': 'DOUBLE', 'november': 'DOUBLE', 'december': 'DOUBLE',
+    'budgetApportionmentItem': {
+        'base': 'DOUBLE',
+        'sector': {
+            'code': 'VARCHAR',
+            'codeCostCenter': 'VARCHAR',
+            'name': 'VARCHAR',
+            'company': {'name': 'VARCHAR'},
+        },
+    },
+}]
+
+ESQUEMA_BUDGET = json.dumps(CAMPOS_BUDGET)
+ESQUEMA_MESES = json.dumps(CAMPOS_MESES)
+
+
+def _esquema_bruto(esquema):
+    # Mesmo esquema com todos os campos como JSON: o valor como veio, sem conversão
+    if isinstance(esquema, dict):
+        return {campo: _esquema_bruto(tipo) for campo, tipo in esquema.items()}
+    if isinstance(esquema, list):
+        return [_esquema_bruto(esquema[0])]
+    return 'JSON'
+
+
+def _campos_convertidos(esquema, texto=False, caminho=()):
+    # Caminhos dos campos com tipo diferente de VARCHAR (ou, com texto=True, dos
+    # VARCHAR). Nos primeiros, o from_json transforma em NULL, sem erro, um valor
+    # de outro tipo (ex.: "4,5" em DOUBLE); nos VARCHAR, um número vira texto.
+    if isinstance(esquema, list):
+        esquema = esquema[0]
+    for campo, tipo in esquema.items():
+        if isinstance(tipo, (dict, list)):
+            yield from _campos_convertidos(tipo, texto, caminho + (campo,))
+        elif (tipo == 'VARCHAR') == texto:
+            yield caminho + (campo,)
+
+
+def _sql_nao_convertidos(esquema, origem, unnest=False, texto=False):
+    # Conta, por campo, os valores presentes no JSON que ficaram NULL na conversão
+    # ou, com texto=True, os valores não textuais gravados em campos VARCHAR
+    tipado = f"from_json(payload, '{json.dumps(esquema)}')"
+    bruto = f"from_json(payload, '{json.dumps(_esquema_bruto(esquema))}')"
+    if unnest:
+        tipado, bruto = f'unnest({tipado})', f'unnest({bruto})'
+    if texto:
+        condicao = "json_type(j.{campo}) NOT IN ('VARCHAR', 'NULL')"
+    else:
+        condicao = 't.{campo} IS NULL AND j.{campo} IS NOT NULL'
+    contagens = ',\n        '.join(
+        f"count(*) FILTER (WHERE {condicao.format(campo='.'.join(caminho))}) AS \"{'.'.join(caminho)}\""
+        for caminho in _campos_convertidos(esquema, texto)
+    )
+    return f'''
+    SELECT
+        {contagens}
+    FROM (
+        SELECT {tipado} AS t, {bruto} AS j
+        FROM {origem}
+    )
+'''
+
+
+# Valores da API que não puderam ser convertidos para o tipo do esquema, por
+# campo, nas tabelas raw (ver ArmazemSGO.salvar)
+SQL_NAO_CONVERTIDOS_BUDGET = _sql_nao_convertidos(CAMPOS_BUDGET, 'budget_raw')
+SQL_NAO_CONVERTIDOS_MESES = _sql_nao_convertidos(CAMPOS_MESES, 'budget_months_raw', unnest=True)
+
+# Números (ou outros valores não textuais) recebidos em campos VARCHAR, por campo
+SQL_NUMEROS_EM_TEXTO_BUDGET = _sql_nao_convertidos(CAMPOS_BUDGET, 'budget_raw', texto=True)
+SQL_NUMEROS_EM_TEXTO_MESES = _sql_nao_convertidos(CAMPOS_MESES, 'budget_months_raw', unnest=True, texto=True)
+
+# Tabela 'budget' tipada, com os campos aninhados achatados (separados por '_')
+# a partir dos JSON guardados em budget_raw. 'posicao' é a ordem em que o
+# orçamento foi recebido da API pela primeira vez.
+SQL_BUDGET_TIPADO = f'''
+    SELECT
+        b.active AS active,
+        r.id AS id,
+        b.contractNumber AS contractNumber,
+        b.adjustmentMonth AS adjustmentMonth,
+        b.adjustmentPercentage AS adjustmentPercentage,
+        b.value AS value,
+        b.cycleId AS cycleId,
+        b.supplier.code AS supplier_code,
+        b.supplier.description AS supplier_description,
+        b.budgetAccount.code AS budgetAccount_code,
+        b.budgetAccount.description AS budgetAccount_description,
+        b.origin.description AS origin_description,
+        b.levelSix.description AS levelSix_description,
+        b.manager.description AS manager_description,
+        b.apportionment.name AS apportionment_name,
+        b.apportionment.description AS apportionment_description,
+        b.cycle.budgetYear AS cycle_budgetYear,
+        r.posicao AS posicao
+    FROM (
+        SELECT id, posicao, from_json(payload, '{ESQUEMA_BUDGET}') AS b
+        FROM budget_raw
+    ) r
+'''
+
+# Tabela 'budget_months' tipada: uma linha por item de rateio de cada
+# resposta guardada em budget_months_raw. 'posicao' é a ordem do item na
+# resposta da API (a partir de 1).
+SQL_MESES_TIPADO = f'''
+    SELECT
+        m.budgetId AS budgetId,
+        m.january AS january,
+        m.february AS february,
+        m.march AS march,
+        m.april AS april,
+        m.may AS may,
+        m.june AS june,
+        m.july AS july,
+        m.august AS august,
+        m.september AS september,
+        m.october AS october,
+        m.november AS november,
+        m.december AS december,
+        m.budgetApportionmentItem.base AS budgetApportionmentItem_base,
+        m.budgetApportionmentItem.sector.code AS budgetApportionmentItem_sector_code,
+        m.budgetApportionmentItem.sector.codeCostCenter AS budgetApportionmentItem_sector_codeCostCenter,
+        m.budgetApportionmentItem.sector.name AS budgetApportionmentItem_sector_name,
+        m.budgetApportionmentItem.sector.company.name AS budgetApportionmentItem_sector_company_name,
+        posicao
+    FROM (
+        SELECT unnest(meses) AS m, generate_subscripts(meses, 1) AS posicao
+        FROM (
+            SELECT from_json(payload, '{ESQUEMA_MESES}') AS meses
+            FROM budget_months_raw
+        )
+    )
+'''
+
+# Unindo os dados de budget e budget months (uma linha por item de rateio).
+# As posições do orçamento e do item definem a ordem das linhas nos relatórios:
+# a junção é feita em paralelo pelo DuckDB, então a ordem física da tabela
+# (rowid) muda de uma execução para outra.
+SQL_GERAL = '''
+    SELECT
+        b.id AS Id_Orçamento,
+        b.contractNumber AS Contrato,
+        b.adjustmentMonth AS Mes_Reajuste,
+        b.adjustmentPercentage AS Reajuste_Percentual,
+        b.value AS Valor,
+        b.supplier_code AS Cod_Fornecedor,
+        b.budgetAccount_code AS COD_CONTA_CONTABIL,
+        b.budgetAccount_description AS DESC_CONTA_CONTABIL,
+        b.supplier_description AS Fornecedor,
+        b.origin_description AS Origem,
+        bm.budgetApportionmentItem_sector_code AS COD_SETOR,
+        bm.budgetApportionmentItem_sector_codeCostCenter AS COD_CCUSTO,
+        bm.budgetApportionmentItem_sector_name AS CENTRO_CUSTO,
+        bm.budgetApportionmentItem_base AS BASE,
+        bm.budgetApportionmentItem_sector_company_name AS EMPRESA,
+        b.levelSix_description AS Nivel,
+        b.manager_description AS Gestor,
+        b.apportionment_name AS Criterio,
+        b.apportionment_description AS Descricao_criterio,
+        b.cycle_budgetYear AS Ano,
+        bm.january AS Janeiro,
+        bm.february AS Fevereiro,
+        bm.march AS Março,
+        bm.april AS Abril,
+        bm.may AS Maio,
+        bm.june AS Junho,
+        bm.july AS Julho,
+        bm.august AS Agosto,
+        bm.september AS Setembro,
+        bm.october AS Outubro,
+        bm.november AS Novembro,
+        bm.december AS Dezembro,
+        -- Soma total anual
+        COALESCE(bm.january, 0) + COALESCE(bm.february, 0) + COALESCE(bm.march, 0) +
+        COALESCE(bm.april, 0) + COALESCE(bm.may, 0) + COALESCE(bm.june, 0) +
+        COALESCE(bm.july, 0) + COALESCE(bm.august, 0) + COALESCE(bm.september, 0) +
+        COALESCE(bm.october, 0) + COALESCE(bm.november, 0) + COALESCE(bm.december, 0) AS Total_Anual,
+        b.posicao AS posicao_orcamento,
+        bm.posicao AS posicao_item
+    FROM budget b
+    JOIN budget_months bm ON b.id = bm.budgetId
+    ORDER BY b.posicao, b.id, bm.posicao
+'''
+
+# Colunas de 'geral' usadas apenas para ordenar as linhas
+COLUNAS_POSICAO = 'posicao_orcamento, posicao_item'
+
+# Planilha de validação: df_geral completo, como gravado no snapshot, na ordem
+# em que os orçamentos e os itens vieram da API
+SQL_VALIDACAO = f'''
+    SELECT * EXCLUDE ({COLUNAS_POSICAO})
+    FROM geral
+    ORDER BY posicao_orcamento, Id_Orçamento, posicao_item
+'''
+
+# Colunas renomeadas no cabeçalho de 'Validacao dos Dados SGO.xlsx'
+RENOMEAR_VALIDACAO = {"DESC_CONTA_CONTABIL": "DEC_Conta_Contabil"}
+
+# Linhas das planilhas de rateio: df_geral ordenado por orçamento, com o
+# percentual de cada item sobre a BASE total do orçamento calculado em uma
+# única passada (janela por orçamento)
+SQL_RATEIOS = f'''
+    SELECT
+        * EXCLUDE ({COLUNAS_POSICAO}),
+        CASE
+            WHEN COALESCE(SUM(BASE) OVER orcamento, 0) != 0
+                THEN BASE / SUM(BASE) OVER orcamento * 100
+            ELSE 0
+        END AS Percentual
+    FROM geral
+    WHERE Id_Orçamento IS NOT NULL
+    WINDOW orcamento AS (PARTITION BY Id_Orçamento)
+    ORDER BY Id_Orçamento, posicao_item
+'''
+
+# Linhas de rateio de um único orçamento (parâmetro: Id_Orçamento)
+SQL_RATEIO_ORCAMENTO = SQL_RATEIOS.replace('WHERE Id_Orçamento IS NOT NULL', 'WHERE Id_Orçamento = ?')
+
+# Relatório da controladoria: valores somados por ano, conta, fornecedor,
+# nível 6, contrato, gestor e setor/centro de custo. A agregação fica
+# materializada na tabela 'grupo' do banco local (sgo/armazenamento.py) e é
+# recalculada apenas para os grupos dos orçamentos gravados ou removidos.
+SQL_GRUPO_AGREGADO = '''
+    SELECT
+        b.cycle_budgetYear AS ANO,
+        b.budgetAccount_code AS COD_CONTA,
+        b.budgetAccount_description AS CONTA_N05,
+        b.supplier_code AS COD_FORNECEDOR,
+        b.supplier_description AS DES_FORNECEDOR,
+        b.levelSix_description AS "NIVEL 6",
+        b.origin_description AS ORIGEM,
+        b.contractNumber AS "Nº CONTRATO",
+        b.manager_description AS GESTOR,
+        bm.budgetApportionmentItem_sector_code AS COD_SETOR,
+        bm.budgetApportionmentItem_sector_codeCostCenter AS COD_CCUSTO,
+        bm.budgetApportionmentItem_sector_name AS CENTRO_CUSTO,
+        SUM(bm.budgetApportionmentItem_base) AS BASE,
+        MAX(b.adjustmentPercentage) AS "%",
+        SUM(COALESCE(bm.january, 0)) AS JANEIRO,
+        SUM(COALESCE(bm.february, 0)) AS FEVEREIRO,
+        SUM(COALESCE(bm.march, 0)) AS MARÇO,
+        SUM(COALESCE(bm.april, 0)) AS ABRIL,
+        SUM(COALESCE(bm.may, 0)) AS MAIO,
+        SUM(COALESCE(bm.june, 0)) AS JUNHO,
+        SUM(COALESCE(bm.july, 0)) AS JULHO,
+        SUM(COALESCE(bm.august, 0)) AS AGOSTO,
+        SUM(COALESCE(bm.september, 0)) AS SETEMBRO,
+        SUM(COALESCE(bm.october, 0)) AS OUTUBRO,
+        SUM(COALESCE(bm.november, 0)) AS NOVEMBRO,
+        SUM(COALESCE(bm.december, 0)) AS DEZEMBRO,
+        -- Soma total anual
+        SUM(
+            COALESCE(bm.january, 0) + COALESCE(bm.february, 0) + COALESCE(bm.march, 0) +
+            COALESCE(bm.april, 0) + COALESCE(bm.may, 0) + COALESCE(bm.june, 0) +
+            COALESCE(bm.july, 0) + COALESCE(bm.august, 0) + COALESCE(bm.september, 0) +
+            COALESCE(bm.october, 0) + COALESCE(bm.november, 0) + COALESCE(bm.december, 0)
+        ) AS TOTAL
+    FROM budget b
+    JOIN budget_months bm ON b.id = bm.budgetId
+    GROUP BY
+        b.cycle_budgetYear,
+        b.budgetAccount_code,
+        b.budgetAccount_description,
+        b.supplier_code,
+        b.supplier_description,
+        b.levelSix_description,
+        b.origin_description,
+        b.contractNumber,
+        b.manager_description,
+        bm.budgetApportionmentItem_sector_code,
+        bm.budgetApportionmentItem_sector_codeCostCenter,
+        bm.budgetApportionmentItem_sector_name
+'''
+
+# Colunas que identificam cada linha de 'grupo'
+CHAVES_GRUPO = [
+    'ANO', 'COD_CONTA', 'CONTA_N05', 'COD_FORNECEDOR', 'DES_FORNECEDOR', '"NIVEL 6"', 'ORIGEM',
+    '"Nº CONTRATO"', 'GESTOR', 'COD_SETOR', 'COD_CCUSTO', 'CENTRO_CUSTO',
+]
+
+# Relatório da controladoria: leitura da agregação materializada
+SQL_GRUPO = f'''
+    SELECT *
+    FROM grupo
+    ORDER BY {', '.join(CHAVES_GRUPO)}
+'''
+
+# Comparativo ano a ano: total anual de cada conta, fornecedor e empresa em
+# cada ano do snapshot, ao lado do total do ano anterior. Inclui também os
+# itens que existiam no ano anterior e deixaram de existir (TOTAL = 0).
+SQL_COMPARATIVO_ANUAL = '''
+    WITH totais AS (
+        SELECT
+            Ano, COD_CONTA_CONTABIL, DESC_CONTA_CONTABIL, Cod_Fornecedor, Fornecedor, EMPRESA,
+            SUM(Total_Anual) AS TOTAL
+        FROM geral
+        WHERE Ano IS NOT NULL
+        GROUP BY ALL
+    ),
+    anos AS (
+        SELECT DISTINCT Ano FROM totais
+    ),
+    chaves AS (
+        SELECT Ano, COD_CONTA_CONTABIL, DESC_CONTA_CONTABIL, Cod_Fornecedor, Fornecedor, EMPRESA
+        FROM totais
+        UNION
+        SELECT Ano + 1, COD_CONTA_CONTABIL, DESC_CONTA_CONTABIL, Cod_Fornecedor, Fornecedor, EMPRESA
+        FROM totais
+        WHERE Ano + 1 IN (SELECT Ano FROM anos)
+    )
+    SELECT
+        c.Ano AS ANO,
+        c.COD_CONTA_CONTABIL AS COD_CONTA,
+        c.DESC_CONTA_CONTABIL AS CONTA_N05,
+        c.Cod_Fornecedor AS COD_FORNECEDOR,
+        c.Fornecedor AS DES_FORNECEDOR,
+        c.EMPRESA,
+        COALESCE(atual.TOTAL, 0) AS TOTAL,
+        anterior.TOTAL AS TOTAL_ANO_ANTERIOR,
+        COALESCE(atual.TOTAL, 0) - anterior.TOTAL AS VARIACAO,
+        CASE
+            WHEN anterior.TOTAL != 0
+                THEN (COALESCE(atual.TOTAL, 0) - anterior.TOTAL) / anterior.TOTAL * 100
+        END AS "VARIACAO_%"
+    FROM chaves c
+    LEFT JOIN totais atual
+        ON atual.Ano = c.Ano
+        AND atual.COD_CONTA_CONTABIL IS NOT DISTINCT FROM c.COD_CONTA_CONTABIL
+        AND atual.DESC_CONTA_CONTABIL IS NOT DISTINCT FROM c.DESC_CONTA_CONTABIL
+        AND atual.Cod_Fornecedor IS NOT DISTINCT FROM c.Cod_Fornecedor
+        AND atual.Fornecedor IS NOT DISTINCT FROM c.Fornecedor
+        AND atual.EMPRESA IS NOT DISTINCT FROM c.EMPRESA
+    LEFT JOIN totais anterior
+        ON anterior.Ano = c.Ano - 1
+        AND anterior.COD_CONTA_CONTABIL IS NOT DISTINCT FROM c.COD_CONTA_CONTABIL
+        AND anterior.DESC_CONTA_CONTABIL IS NOT DISTINCT FROM c.DESC_CONTA_CONTABIL
+        AND anterior.Cod_Fornecedor IS NOT DISTINCT FROM c.Cod_Fornecedor
+        AND anterior.Fornecedor IS NOT DISTINCT FROM c.Fornecedor
+        AND anterior.EMPRESA IS NOT DISTINCT FROM c.EMPRESA
+    ORDER BY c.COD_CONTA_CONTABIL, c.Cod_Fornecedor, c.EMPRESA, c.Ano
+'''
+
+# Anos presentes no snapshot
+SQL_ANOS = 'SELECT DISTINCT Ano FROM geral WHERE Ano IS NOT NULL ORDER BY Ano'
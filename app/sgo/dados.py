@@ -0,0 +1,228 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import requests
+from tqdm import tqdm
+
+from sgo import config
+from sgo.armazenamento import ArmazemSGO
+from sgo.cache_http import CacheHTTP
+from sgo.checkpoint import CheckpointColeta, caminho_checkpoint
+from sgo.cliente import ClienteSGO
+from sgo.coleta import ErroAPI, buscar_meses_por_orcamento, salvar_falhas
+from sgo.metricas import metricas
+
+
+class ErroSincronizacao(Exception):
+    # Falha na consulta à API que impede a sincronização. Os dados locais
+    # anteriores são mantidos; os scripts encerram com código de erro (ver
+    # obter_dados) e o ServicoSGO.py continua no ar.
+    pass
+
+
+def _obter_orcamentos_ciclo(cliente, api_budget, ciclo=None):
+    # Requisições para obter os dados de budget na API /budgets/get-all
+    # E as tratativas caso algum erro ocorra na requsição
+    params = {'cycleId': ciclo} if ciclo is not None else None
+    try:
+        # A lista de orçamentos decide o que é novo, alterado ou removido: com o
+        # cache HTTP ela é sempre revalidada na API, nunca lida só do cache
+        response = cliente.get(api_budget, params=params, revalidar=True)
+        response.raise_for_status()  # Lança uma exceção se a resposta não for 2xx
+        # Caso o status seja 200, processa o JSON normalmente
+        return response.json()
+
+    except requests.exceptions.HTTPError as http_err:
+        # Trata erros HTTP específicos com base no código de status
+        if response.status_code == 401:
+            mensagem = "Erro de autenticação. Verifique o token de acesso."
+        elif response.status_code == 404:
+            mensagem = "Recurso não encontrado. Verifique a URL da API."
+        elif response.status_code == 500:
+            mensagem = "Erro interno do servidor. Tente novamente mais tarde."
+        else:
+            mensagem = f"Erro HTTP ao acessar a API: {response.status_code} - {http_err}"
+        raise ErroSincronizacao(mensagem) from http_err
+
+    except requests.exceptions.RequestException as req_err:
+        # Trata erros de conexão, tempo de espera, etc.
+        raise ErroSincronizacao(f"Erro ao tentar se conectar à API: {req_err}") from req_err
+
+    except Exception as err:
+        # Trata qualquer outro erro inesperado
+        raise ErroSincronizacao(f"Ocorreu um erro inesperado: {err}") from err
+
+
+def obter_orcamentos(cliente, api_budget, ciclos=None):
+    # Sem ciclos, busca os orçamentos que a API devolve por padrão. Com uma lista
+    # de cycleId, busca os ciclos em paralelo e junta os orçamentos em uma única lista.
+    if not ciclos:
+        return _obter_orcamentos_ciclo(cliente, api_budget)
+
+    with ThreadPoolExecutor(max_workers=len(ciclos)) as executor:
+        respostas = list(executor.map(lambda ciclo: _obter_orcamentos_ciclo(cliente, api_budget, ciclo), ciclos))
+
+    budget = []
+    ids = set()
+    for ciclo, orcamentos in zip(ciclos, respostas):
+        tqdm.write(f"Ciclo {ciclo}: {len(orcamentos)} orçamentos.")
+        for budget_entry in orcamentos:
+            if budget_entry['id'] not in ids:
+                ids.add(budget_entry['id'])
+                budget.append(budget_entry)
+    return budget
+
+
+class _MesesComTrava:
+    # Destino dos meses que toma a trava do banco apenas para gravar cada
+    # resposta: a coleta roda sem a trava e as consultas ao banco continuam
+    def __init__(self, meses, trava):
+        self.meses = meses
+        self.trava = trava
+
+    def __setitem__(self, budget_id, payload):
+        with self.trava:
+            self.meses[budget_id] = payload
+
+    def __contains__(self, budget_id):
+        return budget_id in self.meses
+
+    def __len__(self):
+        return len(self.meses)
+
+    def update(self, meses):
+        for budget_id, payload in meses.items():
+            self[budget_id] = payload
+
+
+def sincronizar(armazem, args, pasta_arquivos, api_budget, api_budget_months, headers, destino=None,
+                trava=None):
+    # Busca os dados na API e atualiza o banco local e o snapshot de df_geral.
+    # destino(recebidos, budget_buscar), se informado, devolve o destino dos meses
+    # durante a coleta no lugar de 'recebidos' (usado pelo modo --fluxo de
+    # RateiosSGO.py para acompanhar cada resposta assim que chega).
+    # trava, se informada, é tomada apenas nos acessos ao banco local, e não
+    # durante as requisições à API (usado pelo ServicoSGO.py, que continua
+    # respondendo enquanto sincroniza).
+    com_trava = trava is not None
+    trava = trava if com_trava else nullcontext()
+
+    # Sessão HTTP compartilhada por todas as requisições à API SGO (conexões
+    # reaproveitadas), com o cache em disco das respostas se --cache-http foi pedido
+    cache = CacheHTTP(args.cache_http) if args.cache_http else None
+    cliente = ClienteSGO(headers, cache=cache)
+    try:
+        with metricas.etapa('coleta_orcamentos') as registro:
+            budget = obter_orcamentos(cliente, api_budget, args.ciclos)
+            registro['orcamentos'] = len(budget)
+
+        # Verificando quais orçamentos precisam ter os meses buscados na API
+        # (com --ciclos, só são removidos os orçamentos dos ciclos consultados)
+        with trava:
+            novos, alterados, removidos = armazem.comparar(budget, args.ciclos)
+            ciclos_fora = armazem.ciclos(removidos) - {budget_entry.get('cycleId') for budget_entry in budget}
+        if ciclos_fora and not args.ciclos:
+            # Sem --ciclos, a lista padrão da API é tratada como completa: os ciclos
+            # guardados por execuções anteriores com --ciclos que ela não trouxe
+            # saem do banco local (e dos relatórios)
+            tqdm.write(
+                f"Sem --ciclos: os orçamentos dos ciclos {', '.join(map(str, sorted(ciclos_fora)))}, que não "
+                f"estão na lista padrão da API, serão removidos do banco local. Use --ciclos para mantê-los."
+            )
+        if args.sync:
+            ids_buscar = set(novos) | set(alterados)
+            budget_buscar = [budget_entry for budget_entry in budget if budget_entry['id'] in ids_buscar]
+            tqdm.write(
+                f"Sincronização: {len(novos)} orçamentos novos, {len(alterados)} alterados, "
+                f"{len(removidos)} removidos e {len(budget) - len(budget_buscar)} sem alteração."
+            )
+        else:
+            budget_buscar = budget
+
+        # Com --resume, os orçamentos já gravados no checkpoint não são buscados de novo
+        checkpoint = CheckpointColeta(caminho_checkpoint(armazem.caminho))
+        if args.resume:
+            budget_pendentes, meses_checkpoint = checkpoint.pendentes(budget_buscar)
+            tqdm.write(f"Retomando coleta: {len(meses_checkpoint)} orçamentos já obtidos, {len(budget_pendentes)} pendentes.")
+        else:
+            checkpoint.limpar()
+            budget_pendentes, meses_checkpoint = budget_buscar, {}
+
+        # Os meses vão para o banco local em lotes à medida que chegam, já convertidos
+        # nas colunas tipadas; apenas um lote de respostas fica em memória
+        with trava:
+            recebidos = armazem.receber_meses()
+        meses_por_orcamento = destino(recebidos, budget_buscar) if destino is not None else recebidos
+        if com_trava:
+            meses_por_orcamento = _MesesComTrava(meses_por_orcamento, trava)
+        meses_por_orcamento.update(meses_checkpoint)
+
+        # Obtendo os detalhes dos meses de cada orçamento com requisições em paralelo
+        # (o número de requisições simultâneas e o teto por segundo ficam em sgo/config.py)
+        try:
+            with metricas.etapa('coleta_meses') as registro:
+                _, falhas = buscar_meses_por_orcamento(
+                    budget_pendentes, api_budget_months, cliente, checkpoint,
+                    meses_por_orcamento=meses_por_orcamento,
+                )
+                registro['orcamentos'] = len(budget_pendentes)
+                registro['falhas'] = len(falhas)
+        except ErroAPI as api_err:
+            raise ErroSincronizacao(
+                f"{api_err}\nOs orçamentos já obtidos foram mantidos. Use --resume para continuar a coleta."
+            ) from api_err
+
+        # Orçamentos que não puderam ser obtidos ficam registrados em uma planilha à parte
+        salvar_falhas(falhas, pasta_arquivos)
+
+        tqdm.write(cliente.resumo())
+    finally:
+        # A sessão HTTP e o cache em disco são fechados também quando a API falha
+        cliente.close()
+
+    # Atualizando o banco local: orçamentos removidos da API saem, os obtidos são gravados.
+    # Os orçamentos cujos meses não foram obtidos também saem, mesmo que já
+    # estivessem no banco: os dados da execução anterior podem estar
+    # desatualizados, e a planilha de falhas informa que ficaram de fora dos
+    # relatórios. Na próxima sincronização eles são buscados de novo.
+    with metricas.etapa('normalizacao') as registro, trava:
+        # Contados antes de salvar, que descarta a área de recebimento
+        registro['orcamentos'] = len(recebidos)
+        armazem.remover(set(removidos) | {falha.budget_id for falha in falhas})
+        armazem.salvar(budget_buscar, recebidos)
+
+    # Coleta concluída sem falhas: o checkpoint não é mais necessário.
+    # Com falhas, ele é mantido para que --resume busque apenas os orçamentos que faltaram.
+    if not falhas:
+        checkpoint.limpar()
+
+    with metricas.etapa('juncao') as registro, trava:
+        armazem.atualizar_snapshot()
+        registro['linhas'] = armazem.con.execute('SELECT count(*) FROM geral').fetchone()[0]
+
+
+def obter_dados(args, pasta_arquivos, api_budget, api_budget_months, headers):
+    # Devolve o banco local com o snapshot de df_geral atualizado.
+    # Se o snapshot tiver sido gerado há menos de SGO_TTL_SNAPSHOT minutos (por
+    # este ou pelo outro script), a API não é consultada de novo.
+    armazem = ArmazemSGO(args.banco)
+
+    idade = armazem.idade_snapshot()
+    forcar = args.sync or args.resume or args.atualizar
+    if args.ciclos and not set(args.ciclos) <= armazem.ciclos():
+        # Ciclo pedido que ainda não está no banco local
+        forcar = True
+    if forcar or idade is None or idade > config.TTL_SNAPSHOT * 60:
+        try:
+            sincronizar(armazem, args, pasta_arquivos, api_budget, api_budget_months, headers)
+        except ErroSincronizacao as err:
+            tqdm.write(str(err))
+            sys.exit(1)  # Encerra o programa com código de erro
+    else:
+        tqdm.write(
+            f"Usando os dados obtidos da API há {idade / 60:.0f} minuto(s) "
+            f"(validade de {config.TTL_SNAPSHOT} minutos). Use --atualizar para buscar novamente."
+        )
+
+    return armazem
@@ -0,0 +1,104 @@
+# openpyxl e xlsxwriter são importados apenas pelo motor escolhido, para não
+# atrasar o início dos scripts
+
+# Motores disponíveis para gravar os relatórios em Excel:
+# - pandas: monta o DataFrame inteiro e grava com DataFrame.to_excel (modo original)
+# - openpyxl: grava em modo write-only, linha a linha, direto dos lotes do DuckDB
+# - xlsxwriter: grava com xlsxwriter em modo constant_memory (requer o pacote xlsxwriter)
+MOTORES = ('pandas', 'openpyxl', 'xlsxwriter')
+
+# Nome da aba usado pelo DataFrame.to_excel
+NOME_ABA = 'Sheet1'
+
+# Quantidade de linhas lidas do DuckDB por vez nos motores em streaming
+TAMANHO_LOTE = 10000
+
+
+def _colunas(cursor, renomear):
+    renomear = renomear or {}
+    return [renomear.get(descricao[0], descricao[0]) for descricao in cursor.description]
+
+
+def _lotes(cursor, tamanho_lote):
+    while True:
+        linhas = cursor.fetchmany(tamanho_lote)
+        if not linhas:
+            break
+        yield linhas
+
+
+def _exportar_pandas(cursor, file_path, renomear, tamanho_lote):
+    df = cursor.fetchdf()
+    if renomear:
+        df = df.rename(columns=renomear)
+    df.to_excel(file_path, index=False)
+
+
+def _exportar_openpyxl(cursor, file_path, renomear, tamanho_lote):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(NOME_ABA)
+
+    # Mesmo estilo de cabeçalho aplicado pelo pandas
+    lado_fino = Side(style='thin')
+    fonte = Font(bold=True)
+    borda = Border(left=lado_fino, right=lado_fino, top=lado_fino, bottom=lado_fino)
+    alinhamento = Alignment(horizontal='center', vertical='top')
+
+    cabecalho = []
+    for coluna in _colunas(cursor, renomear):
+        celula = WriteOnlyCell(worksheet, value=coluna)
+        celula.font = fonte
+        celula.border = borda
+        celula.alignment = alinhamento
+        cabecalho.append(celula)
+    worksheet.append(cabecalho)
+
+    for linhas in _lotes(cursor, tamanho_lote):
+        for linha in linhas:
+            worksheet.append(linha)
+
+    workbook.save(file_path)
+
+
+def _exportar_xlsxwriter(cursor, file_path, renomear, tamanho_lote):
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise RuntimeError(
+            "O motor 'xlsxwriter' requer o pacote xlsxwriter (pip install xlsxwriter)."
+        ) from None
+
+    workbook = xlsxwriter.Workbook(file_path, {'constant_memory': True, 'nan_inf_to_errors': True})
+    worksheet = workbook.add_worksheet(NOME_ABA)
+    formato_cabecalho = workbook.add_format({
+        'bold': True, 'border': 1, 'align': 'center', 'valign': 'top',
+    })
+
+    worksheet.write_row(0, 0, _colunas(cursor, renomear), formato_cabecalho)
+    numero_linha = 1
+    for linhas in _lotes(cursor, tamanho_lote):
+        for linha in linhas:
+            worksheet.write_row(numero_linha, 0, linha)
+            numero_linha += 1
+
+    workbook.close()
+
+
+_EXPORTADORES = {
+    'pandas': _exportar_pandas,
+    'openpyxl': _exportar_openpyxl,
+    'xlsxwriter': _exportar_xlsxwriter,
+}
+
+
+def exportar_consulta(con, sql, file_path, motor='openpyxl', renomear=None, tamanho_lote=TAMANHO_LOTE):
+    # Executa a consulta e grava o resultado em uma planilha Excel com o motor
+    # escolhido. renomear troca o nome de colunas no cabeçalho da planilha.
+    if motor not in _EXPORTADORES:
+        raise ValueError(f"Motor de exportação desconhecido: {motor}. Opções: {', '.join(MOTORES)}.")
+    cursor = con.execute(sql)
+    _EXPORTADORES[motor](cursor, file_path, renomear, tamanho_lote)
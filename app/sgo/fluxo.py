@@ -0,0 +1,205 @@
+import json
+import queue
+import threading
+
+import duckdb
+
+from sgo import config
+from sgo.consultas import SQL_BUDGET_TIPADO, SQL_GERAL, SQL_MESES_TIPADO
+from sgo.dados import sincronizar
+from sgo.rateios import agrupar_rateios, gerar_planilhas_rateio
+
+# Modo --fluxo de RateiosSGO.py: as planilhas de rateio são geradas enquanto os
+# meses dos orçamentos seguintes ainda estão sendo baixados, em três etapas
+# ligadas por filas limitadas:
+#
+#   coleta (threads HTTP) -> conversão (DuckDB em memória) -> gravação (.xlsx)
+#
+# Cada resposta de meses vai para a fila assim que chega; a conversão monta a
+# junção e o Percentual de um pequeno lote de orçamentos com as mesmas consultas
+# de sgo/consultas.py, e a gravação gera as planilhas do lote. Quando uma fila
+# enche, a etapa anterior aguarda, então a memória fica limitada à profundidade
+# das filas. Ao final, o banco local e o snapshot são atualizados como em --sync.
+
+# Orçamentos convertidos juntos pela etapa de conversão (no máximo)
+TAMANHO_LOTE_FLUXO = 50
+
+# Planilhas enviadas por vez a cada processo de gravação (com --processos > 1)
+TAMANHO_LOTE_GRAVACAO = 8
+
+# Marca de fim das filas
+_FIM = object()
+
+
+class FluxoInterrompido(Exception):
+    # Uma das etapas falhou: as demais param de produzir
+    pass
+
+
+def _colocar(fila, item, cancelado):
+    # put que desiste se outra etapa falhou (evita que a coleta fique
+    # bloqueada para sempre em uma fila que ninguém mais consome)
+    while True:
+        if cancelado.is_set():
+            raise FluxoInterrompido()
+        try:
+            fila.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+class MesesEmFila:
+    # Destino dos meses durante a coleta: grava em 'recebidos' (banco local,
+    # como no modo normal) e envia cada resposta para a fila da conversão
+    def __init__(self, recebidos, fila, cancelado):
+        self.recebidos = recebidos
+        self.fila = fila
+        self.cancelado = cancelado
+
+    def __setitem__(self, budget_id, payload):
+        self.recebidos[budget_id] = payload
+        _colocar(self.fila, (budget_id, payload), self.cancelado)
+
+    def __contains__(self, budget_id):
+        return budget_id in self.recebidos
+
+    def __len__(self):
+        return len(self.recebidos)
+
+    def update(self, meses):
+        for budget_id, payload in meses.items():
+            self[budget_id] = payload
+
+
+def _retirar(fila, cancelado):
+    # get que desiste se outra etapa falhou
+    while True:
+        if cancelado.is_set():
+            raise FluxoInterrompido()
+        try:
+            return fila.get(timeout=0.5)
+        except queue.Empty:
+            continue
+
+
+def _ler_lote(fila, cancelado):
+    # Aguarda a primeira resposta e junta as que já estiverem na fila
+    lote = [_retirar(fila, cancelado)]
+    while lote[-1] is not _FIM and len(lote) < TAMANHO_LOTE_FLUXO:
+        try:
+            lote.append(fila.get_nowait())
+        except queue.Empty:
+            break
+    return lote
+
+
+def _converter_lote(con, lote, orcamentos):
+    # df_geral e Percentual de um lote de orçamentos, com as consultas do
+    # modo normal aplicadas a tabelas que só contêm o lote
+    import pandas as pd
+
+    con.register('budget_raw', pd.DataFrame({
+        'id': [budget_id for budget_id, _ in lote],
+        'payload': [json.dumps(orcamentos[budget_id], ensure_ascii=False) for budget_id, _ in lote],
+        'posicao': range(len(lote)),
+    }))
+    con.register('budget_months_raw', pd.DataFrame({
+        'budget_id': [budget_id for budget_id, _ in lote],
+        'payload': [payload for _, payload in lote],
+    }))
+    con.execute(f'CREATE OR REPLACE TABLE budget AS {SQL_BUDGET_TIPADO}')
+    con.execute(f'CREATE OR REPLACE TABLE budget_months AS {SQL_MESES_TIPADO}')
+    con.execute(f'CREATE OR REPLACE TABLE geral AS {SQL_GERAL}')
+    con.unregister('budget_raw')
+    con.unregister('budget_months_raw')
+    return list(agrupar_rateios(con))
+
+
+class _Etapa(threading.Thread):
+    # Thread de uma etapa que guarda a exceção para ser relançada na principal
+    def __init__(self, nome, alvo, cancelado):
+        super().__init__(name=nome, daemon=True)
+        self.alvo = alvo
+        self.cancelado = cancelado
+        self.erro = None
+
+    def run(self):
+        try:
+            self.alvo()
+        except BaseException as err:
+            if not isinstance(err, FluxoInterrompido):
+                self.erro = err
+            self.cancelado.set()
+
+
+def gerar_rateios_em_fluxo(armazem, args, pasta_arquivos, api_budget, api_budget_months, headers,
+                           output_folder, manifesto, data_referencia, ao_concluir=None):
+    # Consulta a API e gera as planilhas alteradas à medida que os meses chegam,
+    # todas com a data data_referencia.
+    # Devolve a lista de ResultadoPlanilha das planilhas geradas; os orçamentos
+    # que não passaram pelo fluxo (sem alteração no --sync, falhas da coleta)
+    # são tratados depois, a partir do banco local.
+    profundidade = config.PROFUNDIDADE_FILA
+    fila_meses = queue.Queue(maxsize=profundidade)
+    fila_grupos = queue.Queue(maxsize=profundidade)
+    cancelado = threading.Event()
+    orcamentos = {}
+
+    def destino(recebidos, budget_buscar):
+        orcamentos.update((budget_entry['id'], budget_entry) for budget_entry in budget_buscar)
+        return MesesEmFila(recebidos, fila_meses, cancelado)
+
+    # Se uma etapa falha, _Etapa sinaliza 'cancelado' e as demais param sem
+    # esperar o fim das filas; o erro é relançado na thread principal
+    def coletar():
+        sincronizar(armazem, args, pasta_arquivos, api_budget, api_budget_months, headers, destino)
+        _colocar(fila_meses, _FIM, cancelado)
+
+    def converter():
+        con = duckdb.connect(database=':memory:')
+        try:
+            while True:
+                lote = _ler_lote(fila_meses, cancelado)
+                fim = lote[-1] is _FIM
+                if fim:
+                    lote.pop()
+                if lote:
+                    for grupo in _converter_lote(con, lote, orcamentos):
+                        _colocar(fila_grupos, grupo, cancelado)
+                if fim:
+                    break
+        finally:
+            con.close()
+        _colocar(fila_grupos, _FIM, cancelado)
+
+    def grupos():
+        while True:
+            try:
+                grupo = _retirar(fila_grupos, cancelado)
+            except FluxoInterrompido:
+                # O erro da etapa que falhou é relançado ao final
+                return
+            if grupo is _FIM:
+                return
+            yield grupo
+
+    etapas = [_Etapa('coleta', coletar, cancelado), _Etapa('conversao', converter, cancelado)]
+    for etapa in etapas:
+        etapa.start()
+    try:
+        resultados = gerar_planilhas_rateio(
+            manifesto.alterados(grupos(), args.regerar_todos), output_folder, args.processos,
+            data_referencia, ao_concluir, tamanho_lote=TAMANHO_LOTE_GRAVACAO, motor=args.motor_rateio,
+        )
+    except BaseException:
+        cancelado.set()
+        raise
+    finally:
+        for etapa in etapas:
+            etapa.join()
+
+    for etapa in etapas:
+        if etapa.erro is not None:
+            raise etapa.erro
+    return resultados
@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from sgo.metricas import metricas
+
+
+def ler_retry_after(response):
+    # Lê o cabeçalho Retry-After, que pode vir em segundos ou como data HTTP
+    valor = response.headers.get('Retry-After') if response is not None else None
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def ler_limite_taxa(response):
+    # Lê os cabeçalhos de limite de taxa (X-RateLimit-* ou RateLimit-*).
+    # Devolve (restantes, segundos_ate_reset), com None quando ausentes.
+    headers = response.headers
+    restantes = headers.get('X-RateLimit-Remaining', headers.get('RateLimit-Remaining'))
+    reset = headers.get('X-RateLimit-Reset', headers.get('RateLimit-Reset'))
+
+    try:
+        restantes = int(float(restantes)) if restantes is not None else None
+    except ValueError:
+        restantes = None
+
+    try:
+        reset = float(reset) if reset is not None else None
+    except ValueError:
+        reset = None
+    if reset is not None and reset > time.time() / 2:
+        # Alguns servidores enviam o instante do reset (epoch) em vez dos segundos restantes
+        reset = max(0.0, reset - time.time())
+
+    return restantes, reset
+
+
+class ControladorTaxa:
+    # Balde de fichas compartilhado por todas as threads da coleta, com ajuste
+    # AIMD da taxa: sobe aos poucos a cada sucesso e cai pela metade a cada 429.
+    def __init__(self, taxa_inicial, taxa_maxima, taxa_minima=0.2,
+                 fator_reducao=0.5, passo_aumento=0.5, espera_base=1.0, espera_maxima=60.0):
+        self.taxa_maxima = taxa_maxima
+        self.taxa_minima = min(taxa_minima, taxa_maxima)
+        self.taxa = min(max(taxa_inicial, self.taxa_minima), taxa_maxima)
+        self.fator_reducao = fator_reducao
+        self.passo_aumento = passo_aumento
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+        self.total_429 = 0
+        self.total_pausas = 0
+
+        self._fichas = 1.0
+        self._ultimo = time.monotonic()
+        self._pausado_ate = 0.0
+        self._lock = threading.Lock()
+
+    def _repor_fichas(self, agora):
+        # Capacidade de uma ficha: as requisições saem espaçadas, sem rajadas
+        self._fichas = min(1.0, self._fichas + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def adquirir(self):
+        # Bloqueia até existir uma ficha disponível e a API não estar em pausa
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._repor_fichas(agora)
+                if agora < self._pausado_ate:
+                    espera = self._pausado_ate - agora
+                elif self._fichas >= 1.0:
+                    self._fichas -= 1.0
+                    return
+                else:
+                    espera = (1.0 - self._fichas) / self.taxa
+            # Tempo parado no limitador (controle de taxa e pausas pedidas pela API)
+            metricas.incrementar('espera_limitador_segundos', espera)
+            time.sleep(espera)
+
+    def _pausar(self, segundos):
+        # Pausa todas as threads até o servidor voltar a aceitar requisições
+        pausado_ate = time.monotonic() + segundos
+        if pausado_ate > self._pausado_ate:
+            self._pausado_ate = pausado_ate
+            self.total_pausas += 1
+
+    def registrar_sucesso(self, response):
+        restantes, reset = ler_limite_taxa(response)
+        with self._lock:
+            # Aumento aditivo: cerca de passo_aumento req/s a mais a cada segundo
+            self.taxa = min(self.taxa_maxima, self.taxa + self.passo_aumento / self.taxa)
+
+            if restantes is not None and reset is not None:
+                if restantes <= 0:
+                    self._pausar(reset)
+                elif reset > 0:
+                    # Não gasta a cota restante mais rápido do que ela é renovada
+                    self.taxa = max(self.taxa_minima, min(self.taxa, restantes / reset))
+
+    def registrar_limite(self, response, tentativa):
+        # Chamado em um 429 (ou falha de conexão, com response=None).
+        # Devolve quantos segundos a requisição deve aguardar.
+        retry_after = ler_retry_after(response)
+        with self._lock:
+            if response is not None and response.status_code == 429:
+                self.total_429 += 1
+            # Redução multiplicativa da taxa
+            self.taxa = max(self.taxa_minima, self.taxa * self.fator_reducao)
+
+            if retry_after is not None:
+                espera = retry_after
+            else:
+                # Espera exponencial com jitter para as threads não voltarem juntas
+                espera = min(self.espera_maxima, self.espera_base * 2 ** (tentativa - 1))
+                espera = random.uniform(espera / 2, espera)
+            self._pausar(espera)
+
+        return espera
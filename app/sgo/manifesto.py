@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+
+from sgo.rateios import caminho_planilha
+
+# Versão do layout das planilhas de rateio. Alterações em MODELO_RATEIO ou em
+# montar_planilha_rateio devem incrementá-la, para que todas as planilhas sejam
+# geradas de novo. Versão 2: percentuais como números com formato 0.00%.
+# Versão 3: nome da aba limitado a 31 caracteres.
+VERSAO_LAYOUT = 3
+
+NOME_MANIFESTO = '.manifesto_rateios.json'
+
+
+def hash_rateio(cabecalho, linhas):
+    # Hash do conteúdo de uma planilha: campos do cabeçalho (critério, fornecedor,
+    # reajuste...) e todas as linhas da tabela principal
+    conteudo = json.dumps([VERSAO_LAYOUT, cabecalho, linhas], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(conteudo.encode('utf-8')).hexdigest()
+
+
+class ManifestoRateios:
+    # Manifesto, na própria pasta de saída, com o hash do conteúdo e o arquivo de
+    # cada planilha de rateio gerada. Permite gerar de novo apenas as planilhas
+    # cujos dados mudaram e remover as de orçamentos que deixaram de existir.
+    def __init__(self, output_folder):
+        self.output_folder = output_folder
+        self.caminho = os.path.join(output_folder, NOME_MANIFESTO)
+        self.entradas = self._carregar()
+        self._atuais = {}
+        self.sem_alteracao = 0
+
+    def _carregar(self):
+        if not os.path.exists(self.caminho):
+            return {}
+        try:
+            with open(self.caminho, encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, json.JSONDecodeError):
+            # Manifesto ilegível: todas as planilhas são geradas de novo
+            return {}
+        return {int(budget_id): entrada for budget_id, entrada in dados.get('planilhas', {}).items()}
+
+    def _caminho_absoluto(self, arquivo):
+        return os.path.join(self.output_folder, arquivo)
+
+    def alterados(self, grupos, regerar_todos=False):
+        # Filtra os grupos (budget_id, cabecalho, linhas), deixando passar apenas
+        # os orçamentos novos, alterados ou cuja planilha não está mais na pasta
+        for budget_id, cabecalho, linhas in grupos:
+            hash_atual = hash_rateio(cabecalho, linhas)
+            arquivo = os.path.relpath(caminho_planilha(budget_id, cabecalho, self.output_folder), self.output_folder)
+            self._atuais[budget_id] = {'hash': hash_atual, 'arquivo': arquivo}
+
+            anterior = self.entradas.get(budget_id)
+            if (
+                not regerar_todos
+                and anterior is not None
+                and anterior['hash'] == hash_atual
+                and anterior['arquivo'] == arquivo
+                and os.path.exists(self._caminho_absoluto(arquivo))
+            ):
+                self.sem_alteracao += 1
+                continue
+            yield budget_id, cabecalho, linhas
+
+    def vistos(self):
+        # IDs dos orçamentos que já passaram por alterados() nesta execução
+        return set(self._atuais)
+
+    def _remover_arquivo(self, arquivo):
+        caminho = self._caminho_absoluto(arquivo)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+    def atualizar(self, resultados):
+        # Registra as planilhas geradas com sucesso. Se o nome do arquivo mudou
+        # (ex.: fornecedor renomeado), o arquivo anterior é removido.
+        for resultado in resultados:
+            if resultado.erro:
+                # Sem registro: a planilha é tentada de novo na próxima execução
+                self.entradas.pop(resultado.budget_id, None)
+                continue
+            atual = self._atuais[resultado.budget_id]
+            anterior = self.entradas.get(resultado.budget_id)
+            if anterior is not None and anterior['arquivo'] != atual['arquivo']:
+                self._remover_arquivo(anterior['arquivo'])
+            self.entradas[resultado.budget_id] = atual
+
+    def podar(self):
+        # Remove as planilhas de orçamentos que não estão mais nos dados.
+        # Apenas arquivos registrados no manifesto são removidos.
+        removidos = [budget_id for budget_id in self.entradas if budget_id not in self._atuais]
+        for budget_id in removidos:
+            self._remover_arquivo(self.entradas.pop(budget_id)['arquivo'])
+        return removidos
+
+    def salvar(self):
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(
+                {
+                    'versao_layout': VERSAO_LAYOUT,
+                    'planilhas': {str(budget_id): entrada for budget_id, entrada in sorted(self.entradas.items())},
+                },
+                arquivo, ensure_ascii=False, indent=1,
+            )
+        os.replace(temporario, self.caminho)
@@ -0,0 +1,291 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+# Métricas de uma execução: tempo de relógio e de CPU de cada etapa, contadores
+# (requisições, respostas por status, novas tentativas, bytes), histogramas de
+# latência e pico de memória. Ao final, podem ser gravadas como relatório JSON
+# ou no formato textfile do Prometheus (node_exporter), para alertas no job agendado.
+#
+#   with metricas.etapa('coleta_meses') as registro:
+#       ...
+#       registro['orcamentos'] = len(budget)
+#   metricas.incrementar('respostas_http', rotulos={'status': 429})
+#   metricas.observar('requisicao_segundos', duracao)
+
+# Limites (segundos) dos histogramas de latência
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prefixo dos nomes no formato Prometheus
+PREFIXO = 'sgo'
+
+
+def _pico_memoria_windows():
+    # Pico do working set do processo: pelo psutil, se instalado, ou direto
+    # pela API do Windows (GetProcessMemoryInfo)
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        return psutil.Process().memory_info().peak_wset
+
+    import ctypes
+    from ctypes import wintypes
+
+    class _ContadoresMemoria(ctypes.Structure):
+        # PROCESS_MEMORY_COUNTERS
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.WinDLL('kernel32')
+    psapi = ctypes.WinDLL('psapi')
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(_ContadoresMemoria), wintypes.DWORD]
+    psapi.GetProcessMemoryInfo.restype = wintypes.BOOL
+
+    contadores = _ContadoresMemoria()
+    contadores.cb = ctypes.sizeof(contadores)
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(contadores), contadores.cb):
+        return None
+    return contadores.PeakWorkingSetSize
+
+
+def pico_memoria_mb():
+    # Pico de memória residente do processo
+    if sys.platform == 'win32':
+        pico = _pico_memoria_windows()
+        return pico / 1024 / 1024 if pico is not None else None
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+
+class Histograma:
+    def __init__(self, limites=LIMITES_LATENCIA):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)  # a última faixa é +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        posicao = len(self.limites)
+        for indice, limite in enumerate(self.limites):
+            if valor <= limite:
+                posicao = indice
+                break
+        self.contagens[posicao] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantil(self, q):
+        # Estimativa pelo limite superior da faixa que contém o quantil
+        if not self.total:
+            return None
+        alvo = q * self.total
+        acumulado = 0
+        for indice, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return self.limites[indice] if indice < len(self.limites) else float('inf')
+        return float('inf')
+
+    def resumo(self):
+        return {
+            'limites': list(self.limites),
+            'contagens': list(self.contagens),
+            'soma': round(self.soma, 6),
+            'total': self.total,
+            'media': round(self.soma / self.total, 6) if self.total else None,
+            'p50': self.quantil(0.5),
+            'p95': self.quantil(0.95),
+            'p99': self.quantil(0.99),
+        }
+
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted((str(k), str(v)) for k, v in (rotulos or {}).items()))
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos_prometheus(rotulos):
+    if not rotulos:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos) + '}'
+
+
+class Metricas:
+    def __init__(self):
+        self.script = os.path.splitext(os.path.basename(sys.argv[0] or 'sgo'))[0]
+        self.etapas = []
+        self._contadores = {}
+        self._histogramas = {}
+        self._lock = threading.Lock()
+        self._inicio_epoch = time.time()
+        self._inicio = time.perf_counter()
+        self._inicio_cpu = time.process_time()
+
+    @contextlib.contextmanager
+    def etapa(self, nome):
+        # Mede o tempo de relógio e de CPU do bloco. O dicionário devolvido pode
+        # receber volumes processados (linhas, bytes, arquivos...).
+        # Uma etapa repetida (ex.: a cada sincronização do ServicoSGO.py)
+        # substitui o registro anterior: fica apenas a última medição de cada
+        # etapa, e o relatório não cresce enquanto o processo estiver no ar.
+        registro = {'etapa': nome}
+        inicio = time.perf_counter()
+        inicio_cpu = time.process_time()
+        try:
+            yield registro
+        finally:
+            registro['segundos'] = round(time.perf_counter() - inicio, 3)
+            registro['segundos_cpu'] = round(time.process_time() - inicio_cpu, 3)
+            pico = pico_memoria_mb()
+            if pico is not None:
+                registro['pico_memoria_mb'] = round(pico, 1)
+            with self._lock:
+                self.etapas = [anterior for anterior in self.etapas if anterior['etapa'] != nome]
+                self.etapas.append(registro)
+
+    def incrementar(self, nome, valor=1, rotulos=None):
+        chave = _chave(nome, rotulos)
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome, valor, rotulos=None):
+        chave = _chave(nome, rotulos)
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma()
+            histograma.observar(valor)
+
+    def contador(self, nome, rotulos=None):
+        return self._contadores.get(_chave(nome, rotulos), 0)
+
+    def relatorio(self):
+        pico = pico_memoria_mb()
+        with self._lock:
+            return {
+                'script': self.script,
+                'inicio': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self._inicio_epoch)),
+                'segundos': round(time.perf_counter() - self._inicio, 3),
+                'segundos_cpu': round(time.process_time() - self._inicio_cpu, 3),
+                'pico_memoria_mb': round(pico, 1) if pico is not None else None,
+                'etapas': list(self.etapas),
+                'contadores': [
+                    {'nome': nome, 'rotulos': dict(rotulos), 'valor': valor}
+                    for (nome, rotulos), valor in sorted(self._contadores.items())
+                ],
+                'histogramas': [
+                    {'nome': nome, 'rotulos': dict(rotulos), **histograma.resumo()}
+                    for (nome, rotulos), histograma in sorted(self._histogramas.items())
+                ],
+            }
+
+    def salvar_json(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.relatorio(), arquivo, ensure_ascii=False, indent=2)
+
+    def texto_prometheus(self):
+        relatorio = self.relatorio()
+        script = (('script', relatorio['script']),)
+        linhas = []
+
+        def metrica(nome, tipo, ajuda):
+            linhas.append(f'# HELP {PREFIXO}_{nome} {ajuda}')
+            linhas.append(f'# TYPE {PREFIXO}_{nome} {tipo}')
+
+        metrica('execucao_segundos', 'gauge', 'Duração total da execução.')
+        linhas.append(f'{PREFIXO}_execucao_segundos{_rotulos_prometheus(script)} {relatorio["segundos"]}')
+        metrica('execucao_cpu_segundos', 'gauge', 'Tempo de CPU da execução.')
+        linhas.append(f'{PREFIXO}_execucao_cpu_segundos{_rotulos_prometheus(script)} {relatorio["segundos_cpu"]}')
+        metrica('ultima_execucao_timestamp_segundos', 'gauge', 'Instante de término da execução.')
+        linhas.append(f'{PREFIXO}_ultima_execucao_timestamp_segundos{_rotulos_prometheus(script)} {time.time():.0f}')
+        if relatorio['pico_memoria_mb'] is not None:
+            metrica('pico_memoria_bytes', 'gauge', 'Pico de memória residente do processo.')
+            linhas.append(
+                f'{PREFIXO}_pico_memoria_bytes{_rotulos_prometheus(script)} '
+                f'{int(relatorio["pico_memoria_mb"] * 1024 * 1024)}'
+            )
+
+        # Cada valor numérico das etapas vira uma métrica com o rótulo 'etapa'
+        valores_etapas = {}
+        for registro in relatorio['etapas']:
+            rotulos = script + (('etapa', registro['etapa']),)
+            for chave, valor in registro.items():
+                if chave != 'etapa' and isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    valores_etapas.setdefault(chave, []).append((rotulos, valor))
+        for chave, valores in valores_etapas.items():
+            metrica(f'etapa_{chave}', 'gauge', f'Etapa: {chave}.')
+            for rotulos, valor in valores:
+                linhas.append(f'{PREFIXO}_etapa_{chave}{_rotulos_prometheus(rotulos)} {valor}')
+
+        nomes_vistos = set()
+        for contador in relatorio['contadores']:
+            nome = f"{contador['nome']}_total"
+            if nome not in nomes_vistos:
+                metrica(nome, 'counter', f"Contador: {contador['nome']}.")
+                nomes_vistos.add(nome)
+            rotulos = script + tuple(sorted(contador['rotulos'].items()))
+            linhas.append(f'{PREFIXO}_{nome}{_rotulos_prometheus(rotulos)} {contador["valor"]}')
+
+        for histograma in relatorio['histogramas']:
+            nome = histograma['nome']
+            if nome not in nomes_vistos:
+                metrica(nome, 'histogram', f'Histograma: {nome}.')
+                nomes_vistos.add(nome)
+            rotulos = script + tuple(sorted(histograma['rotulos'].items()))
+            acumulado = 0
+            for limite, contagem in zip(histograma['limites'] + ['+Inf'], histograma['contagens']):
+                acumulado += contagem
+                linhas.append(f'{PREFIXO}_{nome}_bucket{_rotulos_prometheus(rotulos + (("le", limite),))} {acumulado}')
+            linhas.append(f'{PREFIXO}_{nome}_sum{_rotulos_prometheus(rotulos)} {histograma["soma"]}')
+            linhas.append(f'{PREFIXO}_{nome}_count{_rotulos_prometheus(rotulos)} {histograma["total"]}')
+
+        return '\n'.join(linhas) + '\n'
+
+    def salvar_prometheus(self, caminho):
+        # Grava em um arquivo temporário e renomeia, para que o node_exporter
+        # nunca leia um arquivo pela metade
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(self.texto_prometheus())
+        os.replace(temporario, caminho)
+
+    def exportar(self, caminho_json=None, caminho_prometheus=None):
+        if caminho_json:
+            self.salvar_json(caminho_json)
+        if caminho_prometheus:
+            self.salvar_prometheus(caminho_prometheus)
+
+    def resumo(self):
+        # Tabela das etapas exibida ao final da execução
+        linhas = [f"{'etapa':<22}{'tempo (s)':>12}{'CPU (s)':>12}"]
+        for registro in self.etapas:
+            linhas.append(f"{registro['etapa']:<22}{registro['segundos']:>12.2f}{registro['segundos_cpu']:>12.2f}")
+        return '\n'.join(linhas)
+
+
+# Métricas da execução atual, compartilhadas pelos módulos de sgo/
+metricas = Metricas()
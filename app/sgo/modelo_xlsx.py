@@ -0,0 +1,294 @@
+import math
+import os
+import re
+from datetime import datetime, timezone
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+# Gravação direta do XML de planilhas .xlsx de uma aba, a partir de um modelo.
+# As partes fixas do pacote (tipos de conteúdo, relações, estilos, workbook) e
+# as células constantes do modelo são montadas uma única vez; em cada arquivo
+# só são escritas as células variáveis, as linhas de dados e as datas do
+# documento. Evita o custo do modelo de objetos do openpyxl (uma Cell por
+# valor, estilos resolvidos célula a célula) quando se gravam milhares de
+# planilhas com o mesmo layout.
+
+# Estilos (índices em cellXfs de styles.xml): padrão e percentual com duas casas
+ESTILO_PADRAO = 0
+ESTILO_PERCENTUAL = 1
+
+# Caracteres que o openpyxl recusa em nomes de aba
+_TITULO_INVALIDO = re.compile(r'[\\*?:/\[\]]')
+
+# Tamanho máximo do nome de uma aba no Excel (acima dele, o arquivo só abre
+# depois de um reparo)
+TAMANHO_MAXIMO_TITULO = 31
+
+# Caracteres de controle que não podem aparecer em XML 1.0: são removidos do
+# texto (o openpyxl recusa a célula inteira)
+_CARACTERES_ILEGAIS = re.compile(r'[\000-\010\013\014\016-\037]')
+
+_NS_PLANILHA = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_RELACOES = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_NS_DOCUMENTO = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+_CONTENT_TYPES = (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '<Override PartName="/docProps/app.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    f'<Relationships xmlns="{_NS_RELACOES}">'
+    f'<Relationship Id="rId1" Type="{_NS_DOCUMENTO}/officeDocument" Target="xl/workbook.xml"/>'
+    f'<Relationship Id="rId2" Type="{_NS_RELACOES}/metadata/core-properties" Target="docProps/core.xml"/>'
+    f'<Relationship Id="rId3" Type="{_NS_DOCUMENTO}/extended-properties" Target="docProps/app.xml"/>'
+    '</Relationships>'
+)
+
+_APP = (
+    '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+    '<Application>Microsoft Excel</Application></Properties>'
+)
+
+_WORKBOOK_RELS = (
+    f'<Relationships xmlns="{_NS_RELACOES}">'
+    f'<Relationship Id="rId1" Type="{_NS_DOCUMENTO}/worksheet" Target="worksheets/sheet1.xml"/>'
+    f'<Relationship Id="rId2" Type="{_NS_DOCUMENTO}/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Fonte e preenchimentos padrão do Excel; o segundo xf aplica o formato
+# embutido 10 (0.00%)
+_STYLES = (
+    f'<styleSheet xmlns="{_NS_PLANILHA}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/><scheme val="minor"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="10" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_CORE = (
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dc:creator>SGO</dc:creator>'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{data}</dcterms:created>'
+    '<dcterms:modified xsi:type="dcterms:W3CDTF">{data}</dcterms:modified>'
+    '</cp:coreProperties>'
+)
+
+_WORKBOOK = (
+    f'<workbook xmlns="{_NS_PLANILHA}" xmlns:r="{_NS_DOCUMENTO}">'
+    '<bookViews><workbookView activeTab="0"/></bookViews>'
+    '<sheets><sheet name="{titulo}" sheetId="1" r:id="rId1"/></sheets>'
+    '<calcPr calcId="124519" fullCalcOnLoad="1"/>'
+    '</workbook>'
+)
+
+# Partes iguais em todos os arquivos, já codificadas
+_PARTES_FIXAS = [
+    ('[Content_Types].xml', _CONTENT_TYPES.encode('utf-8')),
+    ('_rels/.rels', _RELS.encode('utf-8')),
+    ('docProps/app.xml', _APP.encode('utf-8')),
+    ('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS.encode('utf-8')),
+    ('xl/styles.xml', _STYLES.encode('utf-8')),
+]
+
+
+class ZipReprodutivel(ZipFile):
+    # ZipFile que grava todas as entradas com a mesma data, para que o arquivo
+    # gerado dependa apenas do conteúdo (e não do horário em que foi salvo)
+    def __init__(self, file, data_referencia):
+        super().__init__(file, 'w', ZIP_DEFLATED, allowZip64=True)
+        self._data_zip = data_referencia.timetuple()[:6]
+
+    def writestr(self, zinfo_or_arcname, data, *args, **kwargs):
+        if isinstance(zinfo_or_arcname, str):
+            zinfo_or_arcname = ZipInfo(zinfo_or_arcname, date_time=self._data_zip)
+            zinfo_or_arcname.compress_type = ZIP_DEFLATED
+        super().writestr(zinfo_or_arcname, data, *args, **kwargs)
+
+    def write(self, filename, arcname=None, *args, **kwargs):
+        # O openpyxl grava as abas a partir de arquivos temporários: usa o
+        # conteúdo do arquivo, sem a data de modificação dele
+        with open(filename, 'rb') as arquivo:
+            self.writestr(arcname or os.path.basename(filename), arquivo.read())
+
+
+class Campo:
+    # Célula variável do modelo: recebe o valor de 'nome' no dicionário de
+    # campos passado a cada arquivo
+    def __init__(self, nome, estilo=ESTILO_PADRAO, divisor=1):
+        self.nome = nome
+        self.estilo = estilo
+        self.divisor = divisor
+
+
+def letra_coluna(numero):
+    # 1 -> A, 26 -> Z, 27 -> AA
+    letras = ''
+    while numero:
+        numero, resto = divmod(numero - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _escapar(texto):
+    texto = _CARACTERES_ILEGAIS.sub('', texto)
+    return texto.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _escapar_atributo(texto):
+    return _escapar(texto).replace('"', '&quot;')
+
+
+def celula(ref, valor, estilo=ESTILO_PADRAO):
+    # XML de uma célula. None, NaN e infinitos ficam sem célula (vazios, como
+    # o Excel os exibe); textos são gravados como inline strings.
+    atributo_estilo = f' s="{estilo}"' if estilo else ''
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"{atributo_estilo}><v>{int(valor)}</v></c>'
+    if isinstance(valor, float):
+        if not math.isfinite(valor):
+            return ''
+        # Mesma precisão usada pelo openpyxl
+        return f'<c r="{ref}"{atributo_estilo}><v>{valor:.16g}</v></c>'
+    if isinstance(valor, int):
+        return f'<c r="{ref}"{atributo_estilo}><v>{int(valor)}</v></c>'
+    texto = valor if isinstance(valor, str) else str(valor)
+    if not texto:
+        return ''
+    preservar = ' xml:space="preserve"' if texto != texto.strip() else ''
+    return f'<c r="{ref}" t="inlineStr"{atributo_estilo}><is><t{preservar}>{_escapar(texto)}</t></is></c>'
+
+
+def _dividir(valor, divisor):
+    if divisor == 1 or isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return valor
+    return valor / divisor
+
+
+class ModeloPlanilha:
+    # Modelo de planilha com uma aba: linhas de cabeçalho (constantes e Campo),
+    # células mescladas e, abaixo delas, as linhas de dados. estilos_dados
+    # mapeia a posição de uma coluna de dados para (estilo, divisor).
+    def __init__(self, linhas_cabecalho, mesclagens=(), estilos_dados=None):
+        self.primeira_linha_dados = len(linhas_cabecalho) + 1
+        self.largura = max([len(linha) for linha in linhas_cabecalho] or [0])
+
+        # Cada linha do cabeçalho vira uma lista de pedaços de XML: texto
+        # pronto para as constantes e (ref, Campo) para as células variáveis
+        self._cabecalho = []
+        for numero, linha in enumerate(linhas_cabecalho, start=1):
+            if not linha:
+                continue
+            pedacos = [f'<row r="{numero}">']
+            for coluna, valor in enumerate(linha, start=1):
+                ref = f'{letra_coluna(coluna)}{numero}'
+                if isinstance(valor, Campo):
+                    pedacos.append((ref, valor))
+                else:
+                    pedacos.append(celula(ref, valor))
+            pedacos.append('</row>')
+            self._cabecalho.append(self._juntar_constantes(pedacos))
+
+        self._mesclagens = ''
+        if mesclagens:
+            self._mesclagens = (
+                f'<mergeCells count="{len(mesclagens)}">'
+                + ''.join(f'<mergeCell ref="{ref}"/>' for ref in mesclagens)
+                + '</mergeCells>'
+            )
+        self._estilos_dados = estilos_dados or {}
+        # Letras das colunas, calculadas uma vez (linhas mais largas que o
+        # cabeçalho calculam as suas)
+        self._letras = [letra_coluna(coluna) for coluna in range(1, self.largura + 1)]
+
+    @staticmethod
+    def _juntar_constantes(pedacos):
+        # Junta os trechos constantes vizinhos em uma única string
+        juntos = []
+        for pedaco in pedacos:
+            if isinstance(pedaco, str) and juntos and isinstance(juntos[-1], str):
+                juntos[-1] += pedaco
+            else:
+                juntos.append(pedaco)
+        return juntos
+
+    def _xml_aba(self, campos, linhas):
+        partes = []
+        for pedacos in self._cabecalho:
+            for pedaco in pedacos:
+                if isinstance(pedaco, str):
+                    partes.append(pedaco)
+                else:
+                    ref, campo = pedaco
+                    partes.append(celula(ref, _dividir(campos[campo.nome], campo.divisor), campo.estilo))
+
+        largura = self.largura
+        numero = self.primeira_linha_dados - 1
+        estilos = self._estilos_dados
+        for numero, linha in enumerate(linhas, start=self.primeira_linha_dados):
+            letras = self._letras
+            if len(linha) > len(letras):
+                letras = [letra_coluna(coluna) for coluna in range(1, len(linha) + 1)]
+                largura = max(largura, len(linha))
+            partes.append(f'<row r="{numero}">')
+            for posicao, valor in enumerate(linha):
+                estilo = estilos.get(posicao)
+                if estilo is None:
+                    partes.append(celula(f'{letras[posicao]}{numero}', valor))
+                else:
+                    partes.append(celula(f'{letras[posicao]}{numero}', _dividir(valor, estilo[1]), estilo[0]))
+            partes.append('</row>')
+
+        dimensao = f'A1:{letra_coluna(max(largura, 1))}{max(numero, 1)}'
+        return (
+            f'<worksheet xmlns="{_NS_PLANILHA}"><dimension ref="{dimensao}"/>'
+            '<sheetViews><sheetView workbookViewId="0"/></sheetViews>'
+            '<sheetFormatPr defaultRowHeight="15"/><sheetData>'
+            + ''.join(partes)
+            + '</sheetData>' + self._mesclagens
+            + '<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/>'
+            '</worksheet>'
+        )
+
+    def gravar(self, arquivo, titulo, campos, linhas, data_referencia=None):
+        # Grava o .xlsx em 'arquivo' (caminho ou objeto binário). As datas do
+        # documento e do zip são data_referencia (ou o instante atual). Nomes
+        # de aba longos são cortados em TAMANHO_MAXIMO_TITULO caracteres.
+        titulo = titulo[:TAMANHO_MAXIMO_TITULO]
+        if not titulo:
+            raise ValueError("O nome da aba não pode ser vazio")
+        invalido = _TITULO_INVALIDO.search(titulo)
+        if invalido:
+            raise ValueError(f"Caractere inválido {invalido.group(0)} no nome da aba")
+
+        if data_referencia is None:
+            data_referencia = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+        data = data_referencia.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+        with ZipReprodutivel(arquivo, data_referencia) as pacote:
+            for nome, conteudo in _PARTES_FIXAS:
+                pacote.writestr(nome, conteudo)
+            pacote.writestr('docProps/core.xml', _CORE.format(data=data).encode('utf-8'))
+            pacote.writestr('xl/workbook.xml', _WORKBOOK.format(titulo=_escapar_atributo(titulo)).encode('utf-8'))
+            pacote.writestr('xl/worksheets/sheet1.xml', self._xml_aba(campos, linhas).encode('utf-8'))
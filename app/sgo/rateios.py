@@ -0,0 +1,276 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from dataclasses import dataclass
+from itertools import islice
+
+from sgo.consultas import SQL_RATEIO_ORCAMENTO, SQL_RATEIOS
+from sgo.modelo_xlsx import ESTILO_PERCENTUAL, TAMANHO_MAXIMO_TITULO, Campo, ModeloPlanilha, ZipReprodutivel
+
+# Colunas de df_geral usadas no cabeçalho de cada planilha
+COLUNAS_CABECALHO = [
+    "Criterio", "COD_CONTA_CONTABIL", "DESC_CONTA_CONTABIL", "Fornecedor",
+    "Reajuste_Percentual", "Mes_Reajuste", "Descricao_criterio", "Ano",
+]
+
+# Colunas de df_geral emitidas, nesta ordem, em cada linha da tabela principal
+COLUNAS_TABELA = [
+    "EMPRESA", "COD_SETOR", "COD_CCUSTO", "CENTRO_CUSTO", "BASE", "Percentual",
+    "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+    "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro", "Total_Anual",
+]
+
+# Cabeçalho da tabela principal na planilha
+CABECALHO_TABELA = [
+    "EMPRESA", "COD_SETOR", "COD_CCUSTO", "CENTRO_CUSTO", "BASE", "PERCENTUAL",
+    "JANEIRO", "FEVEREIRO", "MARÇO", "ABRIL", "MAIO", "JUNHO",
+    "JULHO", "AGOSTO", "SETEMBRO", "OUTUBRO", "NOVEMBRO", "DEZEMBRO", "TOTAL_ANUAL",
+]
+
+# Posição da coluna Percentual em COLUNAS_TABELA
+_POSICAO_PERCENTUAL = COLUNAS_TABELA.index("Percentual")
+
+# Motores para gravar as planilhas de rateio:
+# - xml: grava o XML da planilha direto a partir de MODELO_RATEIO (padrão)
+# - openpyxl: monta o workbook com o modelo de objetos do openpyxl
+MOTORES_RATEIO = ('xml', 'openpyxl')
+
+# Formato dos percentuais (Reajuste e Percentual), gravados como números: 4,5% é 0.045
+FORMATO_PERCENTUAL = '0.00%'
+
+# Layout da planilha de rateio para o motor xml. O cabeçalho (linhas 1-7), as
+# células mescladas e os estilos são montados uma vez; em cada arquivo só são
+# preenchidos os campos do orçamento e as linhas da tabela principal.
+MODELO_RATEIO = ModeloPlanilha(
+    [
+        ["Critério", None, None, "Conta Contábil", "Descrição de Conta"],
+        [Campo("Criterio"), None, None, Campo("COD_CONTA_CONTABIL"), Campo("DESC_CONTA_CONTABIL")],
+        ["NR_CONTRATO", "CD_FORNECEDOR", "NM_FORNECEDOR", "Mês Reajuste", "% de Reajuste", "Regra"],
+        [
+            "", Campo("Fornecedor"), "", Campo("Mes_Reajuste"),
+            Campo("Reajuste_Percentual", ESTILO_PERCENTUAL, 100), Campo("Descricao_criterio"),
+        ],
+        [],
+        [],
+        CABECALHO_TABELA,
+    ],
+    mesclagens=["A1:C1", "A2:C2", "E1:F1", "E2:F2"],
+    estilos_dados={_POSICAO_PERCENTUAL: (ESTILO_PERCENTUAL, 100)},
+)
+
+
+def agrupar_rateios(con, budget_id=None):
+    # Percorre df_geral uma única vez, já ordenado por orçamento e com o
+    # Percentual calculado no DuckDB. Para cada orçamento devolve
+    # (budget_id, cabecalho, linhas), com as linhas montadas a partir das
+    # colunas já convertidas em listas. Com budget_id, apenas esse orçamento.
+    if budget_id is None:
+        df = con.execute(SQL_RATEIOS).fetchdf()
+    else:
+        df = con.execute(SQL_RATEIO_ORCAMENTO, [budget_id]).fetchdf()
+    if df.empty:
+        return
+
+    ids = df["Id_Orçamento"].tolist()
+    colunas_cabecalho = {coluna: df[coluna].tolist() for coluna in COLUNAS_CABECALHO}
+    colunas_tabela = [df[coluna].tolist() for coluna in COLUNAS_TABELA]
+
+    # Cada intervalo [inicio, fim) de linhas consecutivas com o mesmo ID é um orçamento
+    inicio = 0
+    for fim in range(1, len(ids) + 1):
+        if fim < len(ids) and ids[fim] == ids[inicio]:
+            continue
+        cabecalho = {coluna: valores[inicio] for coluna, valores in colunas_cabecalho.items()}
+        linhas = list(zip(*(valores[inicio:fim] for valores in colunas_tabela)))
+        yield ids[inicio], cabecalho, linhas
+        inicio = fim
+
+
+@dataclass
+class ResultadoPlanilha:
+    budget_id: int
+    file_path: str
+    erro: str = None
+
+
+def salvar_workbook(workbook, file_path, data_referencia=None):
+    # Sem data de referência, salva normalmente. Com ela, as datas do documento
+    # e do zip são fixas e o arquivo é idêntico byte a byte entre execuções
+    # com os mesmos dados (em série ou em paralelo).
+    if data_referencia is None:
+        workbook.save(file_path)
+        return
+
+    from openpyxl.writer.excel import ExcelWriter
+
+    workbook.properties.created = data_referencia
+    workbook.properties.modified = data_referencia
+    with ZipReprodutivel(file_path, data_referencia) as archive:
+        ExcelWriter(workbook, archive).write_data()
+
+
+def nome_seguro(texto):
+    return texto.replace("/", "_").replace("\\", "_").replace(" ", "_")
+
+
+def texto_ano(ano):
+    # Ano do ciclo do orçamento (cycle_budgetYear) usado nas pastas e nomes de arquivo
+    if ano is None or ano != ano:  # ausente ou NaN
+        return "sem_ano"
+    return str(int(ano))
+
+
+def titulo_aba(cabecalho):
+    # Nome da aba: o fornecedor, cortado no limite de caracteres do Excel
+    return nome_seguro(cabecalho["Fornecedor"])[:TAMANHO_MAXIMO_TITULO]
+
+
+def caminho_planilha(budget_id, cabecalho, output_folder):
+    # Nome do arquivo personalizado, em uma subpasta por ano do ciclo
+    ano = texto_ano(cabecalho["Ano"])
+    safe_fornecedor = nome_seguro(cabecalho["Fornecedor"])  # separar só a primeiro nome
+    file_name = f"{ano}_{safe_fornecedor}_{budget_id}.xlsx"
+    return os.path.join(output_folder, ano, file_name)
+
+
+def _fracao(percentual):
+    # 4.5 (%) -> 0.045, para a célula com FORMATO_PERCENTUAL; vazios ficam como estão
+    if isinstance(percentual, (int, float)) and not isinstance(percentual, bool):
+        return percentual / 100
+    return percentual
+
+
+def montar_planilha_rateio(cabecalho, linhas):
+    # Monta o workbook da planilha de rateio de um orçamento (sem gravar), com
+    # o openpyxl. O motor xml produz a mesma planilha a partir de MODELO_RATEIO.
+
+    # openpyxl é carregado só quando a primeira planilha é gerada
+    from openpyxl import Workbook
+
+    # Criando o workbook e aba principal com título único
+    workbook = Workbook()
+    worksheet = workbook.create_sheet(title=titulo_aba(cabecalho))
+
+    # Remover aba padrão criada automaticamente
+    if "Sheet" in workbook.sheetnames:
+        del workbook["Sheet"]
+
+    # Adiciona o cabeçalho (linhas 1-4)
+    worksheet.merge_cells("A1:C1")
+    worksheet.merge_cells("A2:C2")
+    worksheet["A1"] = "Critério"
+    worksheet["A2"] = cabecalho["Criterio"]
+
+    worksheet["D1"] = "Conta Contábil"
+    worksheet["D2"] = cabecalho["COD_CONTA_CONTABIL"]
+
+    worksheet.merge_cells("E1:F1")
+    worksheet.merge_cells("E2:F2")
+    worksheet["E1"] = "Descrição de Conta"
+    worksheet["E2"] = cabecalho["DESC_CONTA_CONTABIL"]
+
+    # Linha 3
+    worksheet.append(["NR_CONTRATO", "CD_FORNECEDOR", "NM_FORNECEDOR", "Mês Reajuste", "% de Reajuste", "Regra"])
+    worksheet.append([
+        "", cabecalho["Fornecedor"], "", cabecalho["Mes_Reajuste"],
+        _fracao(cabecalho["Reajuste_Percentual"]), cabecalho["Descricao_criterio"]
+    ])
+    worksheet["E4"].number_format = FORMATO_PERCENTUAL
+
+    # Deixe as linhas 5 a 8 vazias
+    for _ in range(2):
+        worksheet.append([])
+
+    # Adiciona o cabeçalho da tabela principal (a partir da linha 6)
+    worksheet.append(CABECALHO_TABELA)
+
+    # Adiciona os dados da tabela principal
+    for linha in linhas:
+        linha = list(linha)
+        linha[_POSICAO_PERCENTUAL] = _fracao(linha[_POSICAO_PERCENTUAL])
+        worksheet.append(linha)
+        worksheet.cell(row=worksheet.max_row, column=_POSICAO_PERCENTUAL + 1).number_format = FORMATO_PERCENTUAL
+
+    return workbook
+
+
+def salvar_planilha_rateio(arquivo, cabecalho, linhas, data_referencia=None, motor='xml'):
+    # Grava a planilha de rateio em 'arquivo' (caminho ou objeto binário) com o motor escolhido
+    if motor == 'xml':
+        MODELO_RATEIO.gravar(arquivo, titulo_aba(cabecalho), cabecalho, linhas, data_referencia)
+    elif motor == 'openpyxl':
+        salvar_workbook(montar_planilha_rateio(cabecalho, linhas), arquivo, data_referencia)
+    else:
+        raise ValueError(f"Motor de rateio desconhecido: {motor}. Opções: {', '.join(MOTORES_RATEIO)}.")
+
+
+def gerar_planilha_rateio(budget_id, cabecalho, linhas, output_folder, data_referencia=None, motor='xml'):
+    # Gera a planilha de rateio de um orçamento e devolve o caminho do arquivo
+    file_path = caminho_planilha(budget_id, cabecalho, output_folder)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    salvar_planilha_rateio(file_path, cabecalho, linhas, data_referencia, motor)
+    return file_path
+
+
+def _gerar_lote(lote, output_folder, data_referencia, motor):
+    # Gera as planilhas de um lote de orçamentos, registrando a falha de cada
+    # arquivo sem interromper os demais
+    resultados = []
+    for budget_id, cabecalho, linhas in lote:
+        try:
+            file_path = gerar_planilha_rateio(budget_id, cabecalho, linhas, output_folder, data_referencia, motor)
+            resultados.append(ResultadoPlanilha(budget_id, file_path))
+        except Exception as err:
+            resultados.append(ResultadoPlanilha(
+                budget_id, caminho_planilha(budget_id, cabecalho, output_folder), f"{type(err).__name__}: {err}"
+            ))
+    return resultados
+
+
+def gerar_planilhas_rateio(grupos, output_folder, processos=1, data_referencia=None, ao_concluir=None,
+                           tamanho_lote=None, motor='xml'):
+    # Gera as planilhas de todos os orçamentos. Com processos > 1, os orçamentos
+    # são divididos em lotes entre processos, cada um gravando os seus arquivos.
+    # Com tamanho_lote, os lotes são formados à medida que os grupos chegam (sem
+    # ler todos antes), com no máximo dois lotes por processo em andamento.
+    # ao_concluir(resultado) é chamado para cada arquivo à medida que termina.
+    # Devolve a lista de ResultadoPlanilha.
+    resultados = []
+
+    def concluir(lote_resultados):
+        for resultado in lote_resultados:
+            resultados.append(resultado)
+            if ao_concluir is not None:
+                ao_concluir(resultado)
+
+    if processos <= 1:
+        for grupo in grupos:
+            concluir(_gerar_lote([grupo], output_folder, data_referencia, motor))
+        return resultados
+
+    if tamanho_lote:
+        grupos = iter(grupos)
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            pendentes = set()
+            while True:
+                lote = list(islice(grupos, tamanho_lote))
+                if lote:
+                    pendentes.add(executor.submit(_gerar_lote, lote, output_folder, data_referencia, motor))
+                if pendentes and (not lote or len(pendentes) >= processos * 2):
+                    concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        concluir(futuro.result())
+                if not lote and not pendentes:
+                    break
+        return resultados
+
+    grupos = list(grupos)
+    # Lotes pequenos o bastante para equilibrar a carga entre os processos
+    tamanho_lote = max(1, len(grupos) // (processos * 8))
+    lotes = [grupos[i:i + tamanho_lote] for i in range(0, len(grupos), tamanho_lote)]
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [executor.submit(_gerar_lote, lote, output_folder, data_referencia, motor) for lote in lotes]
+        for futuro in as_completed(futuros):
+            concluir(futuro.result())
+
+    return resultados
@@ -0,0 +1,267 @@
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlparse
+
+from tqdm import tqdm
+
+from sgo.consultas import RENOMEAR_VALIDACAO, SQL_ANOS, SQL_COMPARATIVO_ANUAL, SQL_GRUPO, SQL_VALIDACAO
+from sgo.dados import ErroSincronizacao, sincronizar
+from sgo.exportacao import exportar_consulta
+from sgo.manifesto import hash_rateio
+from sgo.metricas import metricas
+from sgo.rateios import agrupar_rateios, caminho_planilha, salvar_planilha_rateio
+
+# Serviço local de relatórios: mantém o banco DuckDB aberto, com df_geral já
+# materializado, e gera sob demanda a planilha de rateio de um orçamento ou os
+# relatórios gerais, sem rodar os scripts inteiros.
+#
+#   GET  /rateio/<budget_id>   planilha de rateio do orçamento
+#   GET  /controladoria        Controladoria.xlsx
+#   GET  /validacao            Validacao dos Dados SGO.xlsx
+#   GET  /comparativo          Comparativo Anual SGO.xlsx (com mais de um ano nos dados)
+#   GET  /status               dados carregados e estatísticas do cache (JSON)
+#   POST /atualizar            sincroniza com a API (como --sync)
+#
+# As planilhas geradas ficam em um cache LRU em memória. Cada uma guarda a
+# versão dos dados de que veio: o hash do conteúdo do orçamento (rateio) ou
+# o instante do snapshot (relatórios gerais). Quando o orçamento muda, a versão
+# deixa de conferir e a planilha é gerada de novo.
+
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Relatórios gerais: rota -> (consulta, nome do arquivo, colunas renomeadas)
+RELATORIOS = {
+    'controladoria': (SQL_GRUPO, 'Controladoria.xlsx', None),
+    'validacao': (SQL_VALIDACAO, 'Validacao dos Dados SGO.xlsx', RENOMEAR_VALIDACAO),
+    'comparativo': (SQL_COMPARATIVO_ANUAL, 'Comparativo Anual SGO.xlsx', None),
+}
+
+
+class CachePlanilhas:
+    # Cache LRU das planilhas geradas, limitado pelo total de bytes.
+    # Cada entrada é (versão, nome do arquivo, conteúdo).
+    def __init__(self, tamanho_maximo):
+        self.tamanho_maximo = tamanho_maximo
+        self.tamanho = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.removidas = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave, versao):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None or entrada[0] != versao:
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada[1], entrada[2]
+
+    def guardar(self, chave, versao, nome_arquivo, conteudo):
+        with self._lock:
+            self._remover(chave)
+            if len(conteudo) > self.tamanho_maximo:
+                return
+            self._entradas[chave] = (versao, nome_arquivo, conteudo)
+            self.tamanho += len(conteudo)
+            while self.tamanho > self.tamanho_maximo:
+                self._remover(next(iter(self._entradas)))
+                self.removidas += 1
+
+    def invalidar(self, chave):
+        with self._lock:
+            self._remover(chave)
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is not None:
+            self.tamanho -= len(entrada[2])
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'planilhas': len(self._entradas),
+                'bytes': self.tamanho,
+                'bytes_maximo': self.tamanho_maximo,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'removidas': self.removidas,
+            }
+
+
+class ServicoRelatorios:
+    def __init__(self, armazem, args, pasta_arquivos, api_budget, api_budget_months, headers, tamanho_cache):
+        self.armazem = armazem
+        self.args = args
+        self.pasta_arquivos = pasta_arquivos
+        self.api = (api_budget, api_budget_months, headers)
+        self.cache = CachePlanilhas(tamanho_cache)
+        # A conexão DuckDB é usada por uma requisição de cada vez
+        self._lock_banco = threading.Lock()
+        # Uma sincronização com a API por vez (a manual e a periódica)
+        self._lock_atualizacao = threading.Lock()
+
+    def _versao_snapshot(self):
+        return str(self.armazem.data_snapshot())
+
+    def rateio(self, budget_id):
+        # Devolve (nome do arquivo, conteúdo, do_cache) ou None se o orçamento não existe
+        with self._lock_banco:
+            grupos = list(agrupar_rateios(self.armazem.con, budget_id))
+            data_referencia = self.armazem.data_snapshot()
+        if not grupos:
+            self.cache.invalidar(('rateio', budget_id))
+            return None
+
+        _, cabecalho, linhas = grupos[0]
+        versao = hash_rateio(cabecalho, linhas)
+        guardada = self.cache.obter(('rateio', budget_id), versao)
+        if guardada is not None:
+            return guardada + (True,)
+
+        nome_arquivo = os.path.basename(caminho_planilha(budget_id, cabecalho, ''))
+        arquivo = io.BytesIO()
+        salvar_planilha_rateio(arquivo, cabecalho, linhas, data_referencia, self.args.motor_rateio)
+        conteudo = arquivo.getvalue()
+        self.cache.guardar(('rateio', budget_id), versao, nome_arquivo, conteudo)
+        return nome_arquivo, conteudo, False
+
+    def relatorio(self, nome):
+        # Devolve (nome do arquivo, conteúdo, do_cache) ou None se não houver dados
+        sql, nome_arquivo, renomear = RELATORIOS[nome]
+        with self._lock_banco:
+            versao = self._versao_snapshot()
+            guardada = self.cache.obter(('relatorio', nome), versao)
+            if guardada is not None:
+                return guardada + (True,)
+            if nome == 'comparativo' and len(self.armazem.con.execute(SQL_ANOS).fetchall()) < 2:
+                return None
+            arquivo = io.BytesIO()
+            exportar_consulta(self.armazem.con, sql, arquivo, self.args.motor_excel, renomear)
+        conteudo = arquivo.getvalue()
+        self.cache.guardar(('relatorio', nome), versao, nome_arquivo, conteudo)
+        return nome_arquivo, conteudo, False
+
+    def atualizar(self):
+        # Sincroniza com a API apenas os orçamentos novos ou alterados. As planilhas
+        # em cache deixam de valer à medida que a versão dos dados muda. As
+        # requisições à API são feitas sem a trava do banco, que só é tomada nas
+        # gravações: as demais rotas continuam respondendo durante a sincronização.
+        args = argparse.Namespace(**{**vars(self.args), 'sync': True, 'resume': False})
+        with self._lock_atualizacao:
+            try:
+                sincronizar(self.armazem, args, self.pasta_arquivos, *self.api, trava=self._lock_banco)
+            finally:
+                # As métricas de cada sincronização são gravadas logo em seguida,
+                # e não apenas quando o serviço é encerrado
+                metricas.exportar(self.args.metricas, self.args.metricas_prometheus)
+        return self.status()
+
+    def status(self):
+        with self._lock_banco:
+            orcamentos = self.armazem.con.execute('SELECT count(*) FROM budget').fetchone()[0]
+            snapshot = self._versao_snapshot()
+        return {'orcamentos': orcamentos, 'snapshot': snapshot, 'cache': self.cache.estatisticas()}
+
+
+class _ManipuladorServico(BaseHTTPRequestHandler):
+    def log_message(self, formato, *args):
+        tqdm.write(f"{self.address_string()} - {formato % args}")
+
+    def _responder(self, status, corpo, tipo='application/json', cabecalhos=None):
+        if isinstance(corpo, (dict, list)):
+            corpo = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _responder_planilha(self, resultado, inicio):
+        nome_arquivo, conteudo, do_cache = resultado
+        duracao = time.perf_counter() - inicio
+        metricas.observar('servico_segundos', duracao, rotulos={'cache': 'acerto' if do_cache else 'falta'})
+        self._responder(200, conteudo, TIPO_XLSX, {
+            'Content-Disposition': f"attachment; filename*=UTF-8''{quote(nome_arquivo)}",
+            'X-Cache': 'HIT' if do_cache else 'MISS',
+            'X-Tempo-Geracao-Ms': f'{duracao * 1000:.1f}',
+        })
+
+    def do_GET(self):
+        servico = self.server.servico
+        partes = [parte for parte in urlparse(self.path).path.split('/') if parte]
+        inicio = time.perf_counter()
+        try:
+            if partes == ['status']:
+                self._responder(200, servico.status())
+            elif len(partes) == 2 and partes[0] == 'rateio':
+                try:
+                    budget_id = int(partes[1])
+                except ValueError:
+                    self._responder(400, {'erro': 'budget_id deve ser um número'})
+                    return
+                resultado = servico.rateio(budget_id)
+                if resultado is None:
+                    self._responder(404, {'erro': f'Orçamento {budget_id} sem itens de rateio nos dados locais'})
+                else:
+                    self._responder_planilha(resultado, inicio)
+            elif len(partes) == 1 and partes[0] in RELATORIOS:
+                resultado = servico.relatorio(partes[0])
+                if resultado is None:
+                    self._responder(404, {'erro': 'Comparativo disponível apenas com mais de um ano nos dados'})
+                else:
+                    self._responder_planilha(resultado, inicio)
+            else:
+                self._responder(404, {'erro': 'Rota desconhecida'})
+        except Exception as err:
+            self._responder(500, {'erro': f'{type(err).__name__}: {err}'})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/atualizar':
+            self._responder(404, {'erro': 'Rota desconhecida'})
+            return
+        try:
+            self._responder(200, self.server.servico.atualizar())
+        except ErroSincronizacao as err:
+            # Erro da API: o serviço continua no ar com os dados anteriores
+            self._responder(502, {'erro': f'Falha ao consultar a API SGO; os dados anteriores foram mantidos. {err}'})
+        except Exception as err:
+            self._responder(500, {'erro': f'{type(err).__name__}: {err}'})
+
+
+def servir(servico, host, porta, intervalo_minutos=None):
+    # Atende as requisições até Ctrl+C. Com intervalo_minutos, sincroniza com a
+    # API periodicamente em segundo plano.
+    servidor = ThreadingHTTPServer((host, porta), _ManipuladorServico)
+    servidor.daemon_threads = True
+    servidor.servico = servico
+    parar = threading.Event()
+
+    def atualizar_periodicamente():
+        while not parar.wait(intervalo_minutos * 60):
+            try:
+                servico.atualizar()
+            except Exception as err:
+                tqdm.write(f"Falha na atualização periódica: {err!r}. Os dados anteriores foram mantidos.")
+
+    if intervalo_minutos:
+        threading.Thread(target=atualizar_periodicamente, name='atualizacao', daemon=True).start()
+
+    tqdm.write(f"Serviço de relatórios SGO em http://{host}:{servidor.server_address[1]} (Ctrl+C para encerrar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        parar.set()
+        servidor.server_close()
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from sgo.armazenamento import ArmazemSGO
+
+MESES = [
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december',
+]
+
+
+def _orcamento(budget_id, fornecedor='F1', contrato='CT-1', ano=2025, criterio=1):
+    # Orçamento no formato de /budgets/get-all
+    return {
+        'active': True,
+        'id': budget_id,
+        'contractNumber': contrato,
+        'adjustmentMonth': 'Janeiro',
+        'adjustmentPercentage': 4.5,
+        'value': 1000.0 * budget_id,
+        'cycleId': ano - 2000,
+        'supplier': {'code': fornecedor, 'description': f'Fornecedor {fornecedor}'},
+        'budgetAccount': {'code': '3.1.1', 'description': 'Conta contábil 1'},
+        'origin': {'description': 'Origem'},
+        'levelSix': {'description': 'Nível 1'},
+        'manager': {'description': 'Gestor 1'},
+        'apportionment': {'name': f'Critério {criterio}', 'description': f'Descrição do critério {criterio}'},
+        'cycle': {'budgetYear': ano},
+    }
+
+
+def _meses(budget_id, setores=(1, 2, 3)):
+    # Corpo JSON de /budget-months: um item por setor, com o valor de cada mês
+    itens = []
+    for setor in setores:
+        item = {mes: float(budget_id * 100 + setor + posicao) for posicao, mes in enumerate(MESES)}
+        item['budgetId'] = budget_id
+        item['budgetApportionmentItem'] = {
+            'base': setor,
+            'sector': {
+                'code': f'S{setor}',
+                'codeCostCenter': f'CC{setor}',
+                'name': f'Centro de custo {setor}',
+                'company': {'name': f'Empresa {setor % 2}'},
+            },
+        }
+        itens.append(item)
+    return json.dumps(itens)
+
+
+@pytest.fixture
+def criar_orcamento():
+    return _orcamento
+
+
+@pytest.fixture
+def criar_meses():
+    return _meses
+
+
+@pytest.fixture
+def armazem():
+    armazem = ArmazemSGO(':memory:')
+    yield armazem
+    armazem.close()
+
+
+class _ManipuladorApi(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        api = self.server.api
+        url = urlparse(self.path)
+        with api.lock:
+            api.requisicoes.append(self.path)
+        consulta = parse_qs(url.query)
+        if url.path == '/budgets/get-all':
+            ciclos = [int(ciclo) for ciclo in consulta.get('cycleId', [])]
+            orcamentos = [orcamento for orcamento in api.orcamentos if not ciclos or orcamento['cycleId'] in ciclos]
+            status, corpo = 200, json.dumps(orcamentos)
+        elif url.path == '/budget-months':
+            budget_id = int(consulta['budgetId'][0])
+            status = api.status_meses.get(budget_id, 200)
+            corpo = _meses(budget_id) if status == 200 else ''
+        else:
+            status, corpo = 404, ''
+
+        corpo = corpo.encode('utf-8')
+        etag = '"' + hashlib.md5(corpo).hexdigest() + '"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, corpo = 304, b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        if status in (200, 304):
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+class ApiFalsa:
+    # API SGO local: /budgets/get-all devolve 'orcamentos' (só os do cycleId
+    # informado, se houver) e /budget-months
+    # devolve os meses de criar_meses, com o status de 'status_meses' quando
+    # definido. As respostas levam ETag e respondem 304 a If-None-Match igual.
+    def __init__(self):
+        self.orcamentos = []
+        self.status_meses = {}
+        self.requisicoes = []
+        self.lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), _ManipuladorApi)
+        self._servidor.daemon_threads = True
+        self._servidor.api = self
+        self.url = f'http://127.0.0.1:{self._servidor.server_address[1]}'
+        self.api_budget = f'{self.url}/budgets/get-all'
+        self.api_budget_months = f'{self.url}/budget-months'
+
+    def iniciar(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def requisicoes_meses(self):
+        with self.lock:
+            return [caminho for caminho in self.requisicoes if caminho.startswith('/budget-months')]
+
+
+@pytest.fixture
+def api_sgo():
+    api = ApiFalsa()
+    api.iniciar()
+    yield api
+    api.parar()
@@ -0,0 +1,97 @@
+import copy
+import json
+
+from sgo.consultas import SQL_GRUPO_AGREGADO, SQL_RATEIOS, SQL_VALIDACAO
+
+
+def _linhas(armazem, sql):
+    # Linhas ordenadas, com os valores arredondados (a ordem das somas pode variar)
+    linhas = armazem.con.execute(sql).fetchall()
+    return sorted(
+        (tuple(round(valor, 6) if isinstance(valor, float) else valor for valor in linha) for linha in linhas),
+        key=repr,
+    )
+
+
+def _conferir_grupo(armazem):
+    assert _linhas(armazem, 'SELECT * FROM grupo') == _linhas(armazem, SQL_GRUPO_AGREGADO)
+
+
+def test_grupo_acompanha_agregacao_completa(armazem, criar_orcamento, criar_meses):
+    orcamentos = {budget_id: criar_orcamento(budget_id) for budget_id in range(1, 7)}
+    orcamentos[5] = criar_orcamento(5, fornecedor='F2', contrato='CT-2')
+    orcamentos[6] = criar_orcamento(6, ano=2024)
+    armazem.salvar(list(orcamentos.values()), {budget_id: criar_meses(budget_id) for budget_id in orcamentos})
+    _conferir_grupo(armazem)
+
+    # Orçamentos que mudam de grupo: o antigo perde o valor e o novo recebe
+    alterados = [
+        criar_orcamento(1, fornecedor='F2', contrato='CT-2'),  # fornecedor, para um grupo existente
+        criar_orcamento(2, contrato='CT-9'),  # contrato, para um grupo novo
+        criar_orcamento(3, ano=2024),  # ano
+    ]
+    armazem.salvar(alterados, {b['id']: criar_meses(b['id']) for b in alterados})
+    _conferir_grupo(armazem)
+
+    # Um orçamento cujo grupo continua com outros orçamentos e um que era o único do grupo
+    armazem.remover([4, 2])
+    _conferir_grupo(armazem)
+    assert armazem.con.execute('SELECT count(*) FROM grupo WHERE "Nº CONTRATO" = \'CT-9\'').fetchone()[0] == 0
+
+
+def test_salvar_sem_alteracao_mantem_grupo(armazem, criar_orcamento, criar_meses):
+    orcamentos = [criar_orcamento(budget_id) for budget_id in range(1, 4)]
+    meses = {b['id']: criar_meses(b['id']) for b in orcamentos}
+    armazem.salvar(orcamentos, meses)
+    antes = _linhas(armazem, 'SELECT * FROM grupo')
+
+    armazem.salvar(copy.deepcopy(orcamentos), meses)
+    assert _linhas(armazem, 'SELECT * FROM grupo') == antes
+    _conferir_grupo(armazem)
+
+
+def test_relatorios_seguem_a_ordem_da_api(armazem, criar_orcamento, criar_meses):
+    # Itens na ordem da resposta de meses; orçamentos na ordem em que chegaram,
+    # com os alterados mantendo a posição original
+    orcamentos = [criar_orcamento(budget_id) for budget_id in (3, 1, 2)]
+    armazem.salvar(orcamentos, {b['id']: criar_meses(b['id'], setores=(2, 3, 1)) for b in orcamentos})
+    novo = criar_orcamento(0)
+    alterado = criar_orcamento(1, contrato='CT-9')
+    armazem.salvar([novo, alterado], {b['id']: criar_meses(b['id'], setores=(5, 4)) for b in (novo, alterado)})
+    armazem.atualizar_snapshot()
+
+    validacao = armazem.con.execute(SQL_VALIDACAO).fetchdf()
+    assert 'posicao_item' not in validacao.columns
+    assert list(zip(validacao['Id_Orçamento'], validacao['COD_SETOR'])) == [
+        (3, 'S2'), (3, 'S3'), (3, 'S1'),
+        (1, 'S5'), (1, 'S4'),
+        (2, 'S2'), (2, 'S3'), (2, 'S1'),
+        (0, 'S5'), (0, 'S4'),
+    ]
+    rateios = armazem.con.execute(SQL_RATEIOS).fetchdf()
+    assert list(zip(rateios['Id_Orçamento'], rateios['COD_SETOR'])) == [
+        (0, 'S5'), (0, 'S4'),
+        (1, 'S5'), (1, 'S4'),
+        (2, 'S2'), (2, 'S3'), (2, 'S1'),
+        (3, 'S2'), (3, 'S3'), (3, 'S1'),
+    ]
+
+
+def test_avisa_numeros_recebidos_em_campos_de_texto(armazem, criar_orcamento, criar_meses, capsys):
+    orcamento = criar_orcamento(1)
+    orcamento['supplier']['code'] = 123
+    orcamento['adjustmentMonth'] = 1
+    meses = json.loads(criar_meses(1))
+    meses[0]['budgetApportionmentItem']['sector']['code'] = 7
+    armazem.salvar([orcamento], {1: json.dumps(meses)})
+
+    saida = capsys.readouterr().out
+    assert "1 valor(es) do campo 'supplier.code'" in saida
+    assert "1 valor(es) do campo 'adjustmentMonth'" in saida
+    assert "1 valor(es) do campo 'budgetApportionmentItem.sector.code'" in saida
+    assert 'ficaram vazios' not in saida
+    assert armazem.con.execute('SELECT supplier_code, adjustmentMonth FROM budget').fetchone() == ('123', '1')
+
+    # Dados no formato esperado não geram aviso
+    armazem.salvar([criar_orcamento(2)], {2: criar_meses(2)})
+    assert 'Aviso' not in capsys.readouterr().out
@@ -0,0 +1,88 @@
+import time
+
+from sgo.cache_http import CacheHTTP
+from sgo.cliente import ClienteSGO
+
+
+def _cliente(tmp_path, **opcoes):
+    return ClienteSGO({}, cache=CacheHTTP(str(tmp_path / 'cache.sqlite'), **opcoes))
+
+
+def test_resposta_dentro_da_validade_nao_acessa_a_rede(api_sgo, tmp_path):
+    url = f'{api_sgo.api_budget_months}?budgetId=1'
+    with _cliente(tmp_path, ttl_minutos=60) as cliente:
+        primeira = cliente.get(url)
+        segunda = cliente.get(url)
+        assert segunda.json() == primeira.json()
+        assert segunda.do_cache
+        assert len(api_sgo.requisicoes_meses()) == 1
+        assert (cliente.cache.acertos, cliente.cache.faltas) == (1, 1)
+
+
+def test_resposta_vencida_e_revalidada_com_304(api_sgo, tmp_path):
+    url = f'{api_sgo.api_budget_months}?budgetId=1'
+    with _cliente(tmp_path, ttl_minutos=0) as cliente:
+        primeira = cliente.get(url)
+        time.sleep(0.01)
+        segunda = cliente.get(url)
+        assert segunda.status_code == 200
+        assert segunda.json() == primeira.json()
+        assert not segunda.do_cache  # passou pela rede (304)
+        assert len(api_sgo.requisicoes_meses()) == 2
+        assert (cliente.cache.revalidados, cliente.cache.faltas) == (1, 1)
+
+
+def test_cache_persiste_entre_execucoes(api_sgo, tmp_path):
+    url = f'{api_sgo.api_budget_months}?budgetId=1'
+    with _cliente(tmp_path, ttl_minutos=60) as cliente:
+        cliente.get(url)
+    with _cliente(tmp_path, ttl_minutos=60) as cliente:
+        assert cliente.em_cache(url)
+        assert cliente.get(url).do_cache
+    assert len(api_sgo.requisicoes_meses()) == 1
+
+
+def test_revalidar_consulta_a_api_mesmo_dentro_da_validade(api_sgo, tmp_path):
+    with _cliente(tmp_path, ttl_minutos=60) as cliente:
+        cliente.get(api_sgo.api_budget)
+        resposta = cliente.get(api_sgo.api_budget, revalidar=True)
+        assert resposta.status_code == 200
+        assert api_sgo.requisicoes.count('/budgets/get-all') == 2
+        assert cliente.cache.revalidados == 1
+
+
+def test_poda_remove_as_respostas_usadas_ha_mais_tempo(api_sgo, tmp_path):
+    cache = CacheHTTP(str(tmp_path / 'cache.sqlite'), ttl_minutos=60)
+    with ClienteSGO({}, cache=cache) as cliente:
+        urls = [f'{api_sgo.api_budget_months}?budgetId={budget_id}' for budget_id in (1, 2, 3)]
+        for url in urls:
+            cliente.get(url)
+            time.sleep(0.01)
+        # Orçamento 1 usado de novo: passa a ser o mais recente
+        cliente.get(urls[0])
+
+        tamanhos = dict(cache._con.execute('SELECT url, tamanho FROM respostas').fetchall())
+        # Cabem apenas as duas respostas usadas mais recentemente
+        cache.tamanho_maximo = tamanhos[urls[0]] + tamanhos[urls[2]]
+        cache.podar()
+
+        assert cliente.em_cache(urls[0])
+        assert not cliente.em_cache(urls[1])
+        assert cliente.em_cache(urls[2])
+        assert cache.removidos == 1
+
+
+def test_poda_remove_vencidas_sem_etag(tmp_path):
+    cache = CacheHTTP(str(tmp_path / 'cache.sqlite'), ttl_minutos=0)
+    agora = time.time() - 1
+    cache._con.executemany(
+        'INSERT INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        [
+            ('http://api/sem-etag', '{}', b'', None, None, agora, agora, 0),
+            ('http://api/com-etag', '{}', b'', '"1"', None, agora, agora, 0),
+        ],
+    )
+    cache.podar()
+    urls = {url for (url,) in cache._con.execute('SELECT url FROM respostas').fetchall()}
+    assert urls == {'http://api/com-etag'}
+    cache.fechar()
@@ -0,0 +1,65 @@
+import json
+
+from sgo.argumentos import criar_parser
+from sgo.armazenamento import ArmazemSGO
+from sgo.checkpoint import CheckpointColeta, caminho_checkpoint
+from sgo.dados import sincronizar
+
+
+def test_checkpoint_devolve_so_os_orcamentos_pendentes(criar_orcamento, criar_meses, tmp_path):
+    checkpoint = CheckpointColeta(str(tmp_path / 'checkpoint.jsonl'))
+    orcamentos = [criar_orcamento(budget_id) for budget_id in (1, 2, 3)]
+    # Corpo com quebras de linha, como pode vir da API
+    checkpoint.registrar(orcamentos[0], json.dumps(json.loads(criar_meses(1)), indent=2))
+    checkpoint.registrar(orcamentos[1], criar_meses(2))
+    checkpoint.fechar()
+
+    # Orçamento 2 alterado na API depois de registrado: precisa ser buscado de novo
+    orcamentos[1]['value'] += 1
+    pendentes, ja_obtidos = checkpoint.pendentes(orcamentos)
+    assert [budget_entry['id'] for budget_entry in pendentes] == [2, 3]
+    assert list(ja_obtidos) == [1]
+    assert json.loads(ja_obtidos[1]) == json.loads(criar_meses(1))
+
+
+def test_checkpoint_ignora_linha_incompleta(criar_orcamento, criar_meses, tmp_path):
+    caminho = tmp_path / 'checkpoint.jsonl'
+    checkpoint = CheckpointColeta(str(caminho))
+    checkpoint.registrar(criar_orcamento(1), criar_meses(1))
+    checkpoint.fechar()
+    # Execução interrompida no meio da gravação do orçamento 2
+    with open(caminho, 'a', encoding='utf-8') as arquivo:
+        arquivo.write('{"budgetId": 2, "hash": "abc", "months": [{"janu')
+
+    assert list(checkpoint.carregar()) == [1]
+
+    checkpoint.limpar()
+    assert not caminho.exists()
+
+
+def test_resume_busca_apenas_os_orcamentos_que_faltaram(api_sgo, criar_orcamento, tmp_path):
+    armazem = ArmazemSGO(str(tmp_path / 'sgo.duckdb'))
+    caminho = tmp_path / 'sgo_checkpoint_coleta.jsonl'
+    assert caminho_checkpoint(armazem.caminho) == str(caminho)
+    api_sgo.orcamentos = [criar_orcamento(budget_id) for budget_id in (1, 2, 3)]
+
+    def executar(*argumentos):
+        args = criar_parser('teste').parse_args(list(argumentos))
+        sincronizar(armazem, args, str(tmp_path), api_sgo.api_budget, api_sgo.api_budget_months, {})
+
+    try:
+        # Primeira coleta com falha no orçamento 2: o checkpoint é mantido
+        api_sgo.status_meses[2] = 500
+        executar()
+        assert set(CheckpointColeta(str(caminho)).carregar()) == {1, 3}
+
+        del api_sgo.status_meses[2]
+        api_sgo.requisicoes.clear()
+        executar('--resume')
+        assert api_sgo.requisicoes_meses() == ['/budget-months?budgetId=2']
+        ids = {budget_id for (budget_id,) in armazem.con.execute('SELECT DISTINCT Id_Orçamento FROM geral').fetchall()}
+        assert ids == {1, 2, 3}
+        # Coleta concluída sem falhas: o checkpoint é descartado
+        assert not caminho.exists()
+    finally:
+        armazem.close()
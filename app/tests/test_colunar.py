@@ -0,0 +1,26 @@
+import os
+
+from sgo.colunar import exportar_colunar
+
+
+def _contar(armazem, pasta, tabela):
+    caminho = os.path.join(pasta, tabela, '**', '*.parquet').replace("'", "''")
+    return armazem.con.execute(f"SELECT count(DISTINCT budgetId) FROM read_parquet('{caminho}')").fetchone()[0]
+
+
+def test_exportacao_substitui_a_anterior_sem_deixar_sobras(armazem, criar_orcamento, criar_meses, tmp_path):
+    pasta = str(tmp_path / 'colunar')
+    armazem.salvar([criar_orcamento(1), criar_orcamento(2)], {1: criar_meses(1), 2: criar_meses(2)})
+    armazem.atualizar_snapshot()
+    exportar_colunar(armazem.con, pasta)
+    assert _contar(armazem, pasta, 'budget_months') == 2
+
+    # Sobras de uma exportação interrompida são descartadas
+    os.makedirs(os.path.join(pasta, 'budget_months.old', 'lixo'))
+
+    armazem.remover([2])
+    armazem.atualizar_snapshot()
+    destinos = exportar_colunar(armazem.con, pasta)
+
+    assert sorted(os.listdir(pasta)) == sorted(os.path.basename(destino) for destino in destinos)
+    assert _contar(armazem, pasta, 'budget_months') == 1
@@ -0,0 +1,100 @@
+import pytest
+
+from sgo.argumentos import criar_parser
+from sgo.cliente import ClienteSGO
+from sgo.dados import ErroSincronizacao, sincronizar
+
+# Porta sem nenhum serviço: a conexão é recusada
+API_FORA_DO_AR = 'http://127.0.0.1:9'
+
+
+def test_sincronizar_fecha_o_cliente_quando_a_api_falha(armazem, tmp_path, monkeypatch):
+    clientes = []
+    fechar = ClienteSGO.close
+
+    def close(cliente):
+        clientes.append(cliente)
+        fechar(cliente)
+
+    monkeypatch.setattr(ClienteSGO, 'close', close)
+    args = criar_parser('teste').parse_args(['--cache-http', str(tmp_path / 'cache.sqlite')])
+
+    with pytest.raises(ErroSincronizacao, match='conectar à API'):
+        sincronizar(
+            armazem, args, str(tmp_path), f'{API_FORA_DO_AR}/budgets/get-all', f'{API_FORA_DO_AR}/budget-months', {},
+        )
+    assert len(clientes) == 1
+    assert clientes[0].cache is None  # cache em disco fechado junto com a sessão
+
+
+def _ids_geral(armazem):
+    return {budget_id for (budget_id,) in armazem.con.execute('SELECT DISTINCT Id_Orçamento FROM geral').fetchall()}
+
+
+def test_orcamento_com_falha_sai_dos_relatorios(armazem, api_sgo, criar_orcamento, tmp_path):
+    api_sgo.orcamentos = [criar_orcamento(budget_id) for budget_id in (1, 2, 3)]
+    pasta = str(tmp_path)
+    planilha_falhas = tmp_path / 'Falhas Coleta SGO.xlsx'
+
+    def executar(*argumentos):
+        args = criar_parser('teste').parse_args(list(argumentos))
+        sincronizar(armazem, args, pasta, api_sgo.api_budget, api_sgo.api_budget_months, {})
+
+    executar()
+    assert _ids_geral(armazem) == {1, 2, 3}
+
+    # Na execução completa seguinte, os meses do orçamento 2 falham: os dados
+    # da execução anterior não ficam nos relatórios
+    api_sgo.status_meses[2] = 500
+    executar()
+    assert _ids_geral(armazem) == {1, 3}
+    assert planilha_falhas.exists()
+
+    # Com a API normalizada, a sincronização busca o orçamento de novo
+    del api_sgo.status_meses[2]
+    executar('--sync')
+    assert _ids_geral(armazem) == {1, 2, 3}
+    assert api_sgo.requisicoes_meses()[-1] == '/budget-months?budgetId=2'
+    assert not planilha_falhas.exists()
+
+
+def test_lista_de_orcamentos_e_revalidada_com_cache_http(armazem, api_sgo, criar_orcamento, tmp_path):
+    args = criar_parser('teste').parse_args(['--sync', '--cache-http', str(tmp_path / 'cache.sqlite')])
+
+    def executar():
+        sincronizar(armazem, args, str(tmp_path), api_sgo.api_budget, api_sgo.api_budget_months, {})
+
+    api_sgo.orcamentos = [criar_orcamento(1)]
+    executar()
+    executar()  # lista inalterada: revalidada com 304
+    assert _ids_geral(armazem) == {1}
+
+    # Orçamento novo dentro da validade do cache: a lista não vem do cache
+    api_sgo.orcamentos = [criar_orcamento(1), criar_orcamento(2)]
+    executar()
+    assert _ids_geral(armazem) == {1, 2}
+    assert api_sgo.requisicoes.count('/budgets/get-all') == 3
+
+
+def test_sincronizacao_sem_ciclos_avisa_ao_remover_outros_ciclos(armazem, api_sgo, criar_orcamento, tmp_path, capsys):
+    api_sgo.orcamentos = [criar_orcamento(1, ano=2025), criar_orcamento(2, ano=2026)]
+
+    def executar(*argumentos):
+        args = criar_parser('teste').parse_args(['--sync', *argumentos])
+        sincronizar(armazem, args, str(tmp_path), api_sgo.api_budget, api_sgo.api_budget_months, {})
+        return capsys.readouterr().out
+
+    executar('--ciclos', '25', '26')
+    assert _ids_geral(armazem) == {1, 2}
+
+    # Só o ciclo 26 com --ciclos: o 25 continua no banco e nos relatórios
+    executar('--ciclos', '26')
+    assert armazem.ciclos() == {25, 26}
+    assert _ids_geral(armazem) == {1, 2}
+
+    # Sem --ciclos, a lista padrão (aqui, só o ciclo 26) remove o ciclo 25, com aviso
+    api_sgo.orcamentos = [criar_orcamento(2, ano=2026)]
+    saida = executar()
+    assert 'ciclos 25' in saida
+    assert armazem.ciclos() == {26}
+    assert _ids_geral(armazem) == {2}
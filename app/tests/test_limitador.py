@@ -0,0 +1,96 @@
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from sgo.limitador import ControladorTaxa, ler_limite_taxa, ler_retry_after
+
+
+def _response(status_code=200, **headers):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return response
+
+
+def test_retry_after_em_segundos_e_em_data_http():
+    assert ler_retry_after(_response(429, **{'Retry-After': '3'})) == 3.0
+    data_http = formatdate(time.time() + 30, usegmt=True)
+    assert ler_retry_after(_response(429, **{'Retry-After': data_http})) == pytest.approx(30, abs=2)
+    assert ler_retry_after(_response(429, **{'Retry-After': 'amanhã'})) is None
+    assert ler_retry_after(_response(429)) is None
+    assert ler_retry_after(None) is None
+
+
+def test_limite_taxa_aceita_segundos_ou_instante_do_reset():
+    assert ler_limite_taxa(_response(**{'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': '10'})) == (5, 10.0)
+    reset_epoch = str(time.time() + 20)
+    restantes, reset = ler_limite_taxa(_response(**{'RateLimit-Remaining': '0', 'RateLimit-Reset': reset_epoch}))
+    assert restantes == 0
+    assert reset == pytest.approx(20, abs=2)
+
+
+def test_aimd_reduz_pela_metade_no_429_e_sobe_aos_poucos():
+    controlador = ControladorTaxa(taxa_inicial=8, taxa_maxima=10, taxa_minima=1)
+
+    controlador.registrar_limite(_response(429, **{'Retry-After': '0'}), tentativa=1)
+    assert controlador.taxa == 4
+    assert controlador.total_429 == 1
+
+    # Aumento aditivo: passo_aumento / taxa a cada sucesso, até a taxa máxima
+    controlador.registrar_sucesso(_response())
+    assert controlador.taxa == pytest.approx(4 + 0.5 / 4)
+    for _ in range(1000):
+        controlador.registrar_sucesso(_response())
+    assert controlador.taxa == 10
+
+    # Redução multiplicativa não passa da taxa mínima
+    for tentativa in range(1, 10):
+        controlador.registrar_limite(_response(429, **{'Retry-After': '0'}), tentativa)
+    assert controlador.taxa == 1
+
+
+def test_retry_after_pausa_todas_as_requisicoes():
+    controlador = ControladorTaxa(taxa_inicial=100, taxa_maxima=100)
+    controlador.adquirir()
+
+    espera = controlador.registrar_limite(_response(429, **{'Retry-After': '0.3'}), tentativa=1)
+    assert espera == 0.3
+    inicio = time.monotonic()
+    controlador.adquirir()
+    assert time.monotonic() - inicio >= 0.29
+    assert controlador.total_pausas == 1
+
+
+def test_sem_retry_after_espera_exponencial_com_jitter():
+    controlador = ControladorTaxa(taxa_inicial=1, taxa_maxima=1, espera_base=1.0, espera_maxima=5.0)
+    for tentativa, maxima in ((1, 1.0), (2, 2.0), (3, 4.0), (6, 5.0)):
+        espera = controlador.registrar_limite(None, tentativa)
+        assert maxima / 2 <= espera <= maxima
+    assert controlador.total_429 == 0  # falhas de conexão não contam como 429
+
+
+def test_cota_esgotada_pausa_ate_o_reset():
+    controlador = ControladorTaxa(taxa_inicial=10, taxa_maxima=10)
+    controlador.adquirir()
+    controlador.registrar_sucesso(_response(**{'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '0.3'}))
+
+    inicio = time.monotonic()
+    controlador.adquirir()
+    assert time.monotonic() - inicio >= 0.29
+
+
+def test_cota_restante_limita_a_taxa():
+    controlador = ControladorTaxa(taxa_inicial=8, taxa_maxima=10, taxa_minima=0.2)
+    controlador.registrar_sucesso(_response(**{'X-RateLimit-Remaining': '6', 'X-RateLimit-Reset': '10'}))
+    assert controlador.taxa == pytest.approx(0.6)
+
+
+def test_requisicoes_saem_espacadas_pela_taxa():
+    controlador = ControladorTaxa(taxa_inicial=20, taxa_maxima=20)
+    inicio = time.monotonic()
+    for _ in range(5):
+        controlador.adquirir()
+    # A primeira ficha já está disponível; as outras quatro saem a cada 1/20 s
+    assert time.monotonic() - inicio >= 4 / 20 * 0.95
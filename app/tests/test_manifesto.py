@@ -0,0 +1,76 @@
+import os
+
+from sgo.manifesto import NOME_MANIFESTO, ManifestoRateios
+from sgo.rateios import ResultadoPlanilha, caminho_planilha
+
+
+def _cabecalho(fornecedor='Fornecedor_1', ano=2025):
+    return {'Fornecedor': fornecedor, 'Ano': ano, 'Critério': 'Critério 1'}
+
+
+def _linhas(valor):
+    return [{'COD_SETOR': 'S1', 'BASE': valor}]
+
+
+def _gerar(manifesto, grupos, pasta, regerar_todos=False):
+    # Simula RateiosSGO.py: grava as planilhas pedidas e atualiza o manifesto
+    gerados = []
+    resultados = []
+    for budget_id, cabecalho, _ in manifesto.alterados(grupos, regerar_todos):
+        caminho = caminho_planilha(budget_id, cabecalho, pasta)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'w') as arquivo:
+            arquivo.write('planilha')
+        gerados.append(budget_id)
+        resultados.append(ResultadoPlanilha(budget_id, caminho))
+    manifesto.atualizar(resultados)
+    removidos = manifesto.podar()
+    manifesto.salvar()
+    return gerados, removidos
+
+
+def test_manifesto_gera_apenas_alterados_e_poda_removidos(tmp_path):
+    pasta = str(tmp_path)
+    grupos = [(1, _cabecalho(), _linhas(10)), (2, _cabecalho('Fornecedor_2'), _linhas(20))]
+    assert _gerar(ManifestoRateios(pasta), grupos, pasta) == ([1, 2], [])
+    assert os.path.exists(os.path.join(pasta, NOME_MANIFESTO))
+
+    # Mesmos dados: nada é gerado de novo
+    manifesto = ManifestoRateios(pasta)
+    assert _gerar(manifesto, grupos, pasta) == ([], [])
+    assert manifesto.sem_alteracao == 2
+
+    # Dados alterados, orçamento removido e orçamento novo
+    arquivo_removido = caminho_planilha(2, _cabecalho('Fornecedor_2'), pasta)
+    grupos = [(1, _cabecalho(), _linhas(11)), (3, _cabecalho('Fornecedor_3'), _linhas(30))]
+    assert _gerar(ManifestoRateios(pasta), grupos, pasta) == ([1, 3], [2])
+    assert not os.path.exists(arquivo_removido)
+
+    # Com regerar_todos, todas as planilhas são geradas
+    assert _gerar(ManifestoRateios(pasta), grupos, pasta, regerar_todos=True) == ([1, 3], [])
+
+
+def test_manifesto_regera_planilha_apagada_ou_renomeada(tmp_path):
+    pasta = str(tmp_path)
+    grupos = [(1, _cabecalho(), _linhas(10)), (2, _cabecalho('Fornecedor_2'), _linhas(20))]
+    _gerar(ManifestoRateios(pasta), grupos, pasta)
+
+    # Planilha apagada da pasta
+    os.remove(caminho_planilha(1, _cabecalho(), pasta))
+    assert _gerar(ManifestoRateios(pasta), grupos, pasta) == ([1], [])
+
+    # Fornecedor renomeado: o arquivo com o nome antigo é removido
+    arquivo_antigo = caminho_planilha(2, _cabecalho('Fornecedor_2'), pasta)
+    grupos[1] = (2, _cabecalho('Fornecedor_Novo'), _linhas(20))
+    assert _gerar(ManifestoRateios(pasta), grupos, pasta) == ([2], [])
+    assert not os.path.exists(arquivo_antigo)
+    assert os.path.exists(caminho_planilha(2, _cabecalho('Fornecedor_Novo'), pasta))
+
+
+def test_manifesto_ilegivel_regera_tudo(tmp_path):
+    pasta = str(tmp_path)
+    grupos = [(1, _cabecalho(), _linhas(10))]
+    _gerar(ManifestoRateios(pasta), grupos, pasta)
+    with open(os.path.join(pasta, NOME_MANIFESTO), 'w') as arquivo:
+        arquivo.write('{')
+    assert _gerar(ManifestoRateios(pasta), grupos, pasta) == ([1], [])
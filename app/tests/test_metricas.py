@@ -0,0 +1,23 @@
+from sgo.metricas import Metricas
+
+
+def _series(metricas):
+    return [linha for linha in metricas.texto_prometheus().splitlines() if not linha.startswith('#')]
+
+
+def test_etapa_repetida_mantem_apenas_a_ultima_medicao():
+    metricas = Metricas()
+    metricas.script = 'teste'
+    for orcamentos in (10, 20, 30):
+        with metricas.etapa('coleta_meses') as registro:
+            registro['orcamentos'] = orcamentos
+        with metricas.etapa('juncao'):
+            pass
+
+    assert [registro['etapa'] for registro in metricas.etapas] == ['coleta_meses', 'juncao']
+    assert metricas.etapas[0]['orcamentos'] == 30
+
+    # Cada série aparece uma única vez no textfile do Prometheus
+    series = [linha.rsplit(' ', 1)[0] for linha in _series(metricas)]
+    assert len(series) == len(set(series))
+    assert 'sgo_etapa_orcamentos{script="teste",etapa="coleta_meses"} 30' in _series(metricas)
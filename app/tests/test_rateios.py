@@ -0,0 +1,65 @@
+import io
+from datetime import datetime
+
+import pytest
+from openpyxl import load_workbook
+
+from sgo.rateios import agrupar_rateios, salvar_planilha_rateio
+
+DATA_REFERENCIA = datetime(2025, 1, 1)
+
+
+def _planilha(cabecalho, linhas, motor, data_referencia=DATA_REFERENCIA):
+    arquivo = io.BytesIO()
+    salvar_planilha_rateio(arquivo, cabecalho, linhas, data_referencia, motor)
+    return arquivo.getvalue()
+
+
+def _conteudo(dados):
+    # Tudo o que o usuário vê na planilha: abas, valores, formatos e mesclagens
+    workbook = load_workbook(io.BytesIO(dados))
+    abas = []
+    for worksheet in workbook.worksheets:
+        celulas = [
+            (celula.coordinate, celula.value, celula.number_format)
+            for linha in worksheet.iter_rows() for celula in linha
+            if celula.value not in (None, '')
+        ]
+        abas.append((worksheet.title, celulas, sorted(map(str, worksheet.merged_cells.ranges))))
+    return abas
+
+
+@pytest.fixture
+def grupos(armazem, criar_orcamento, criar_meses):
+    orcamentos = [
+        criar_orcamento(1),
+        # Caracteres que precisam ser escapados no XML e fornecedor maior que o limite do nome da aba
+        criar_orcamento(2, fornecedor='A&B <Serviços> "Ltda" / filial com nome comprido'),
+    ]
+    orcamentos[1]['adjustmentMonth'] = None
+    orcamentos[1]['adjustmentPercentage'] = None
+    armazem.salvar(orcamentos, {budget_entry['id']: criar_meses(budget_entry['id']) for budget_entry in orcamentos})
+    armazem.atualizar_snapshot()
+    return list(agrupar_rateios(armazem.con))
+
+
+def test_motor_xml_gera_a_mesma_planilha_que_o_openpyxl(grupos):
+    assert [budget_id for budget_id, _, _ in grupos] == [1, 2]
+    for _, cabecalho, linhas in grupos:
+        xml = _conteudo(_planilha(cabecalho, linhas, 'xml'))
+        openpyxl = _conteudo(_planilha(cabecalho, linhas, 'openpyxl'))
+        assert xml == openpyxl
+        celulas = {coordenada: (valor, formato) for coordenada, valor, formato in xml[0][1]}
+        assert celulas['A8'][0] == linhas[0][0]
+        assert celulas['F8'][1] == '0.00%'
+
+
+def test_motor_xml_e_reprodutivel_com_data_de_referencia(grupos):
+    _, cabecalho, linhas = grupos[0]
+    assert _planilha(cabecalho, linhas, 'xml') == _planilha(cabecalho, linhas, 'xml')
+
+
+def test_motor_desconhecido(grupos):
+    _, cabecalho, linhas = grupos[0]
+    with pytest.raises(ValueError, match='Motor de rateio desconhecido'):
+        _planilha(cabecalho, linhas, 'csv')